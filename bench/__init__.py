@@ -0,0 +1 @@
+"""Timing of model and control hot paths against a stored baseline."""
@@ -0,0 +1,75 @@
+"""Run the benchmark suite :
+python -m bench [--sizes 16 64] [--update-baseline] [--fuzz CASES]
+"""
+
+import argparse
+import os
+import sys
+
+from . import suite
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=suite.SIZES)
+    parser.add_argument("--backends", nargs="+", default=suite.BACKENDS)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5, help="allowed slowdown ratio"
+    )
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--fuzz",
+        type=int,
+        default=200,
+        metavar="CASES",
+        help="differential fuzzing cases, see tools.fuzz",
+    )
+    args = parser.parse_args(argv)
+
+    results = suite.run(args.sizes, args.backends)
+    mismatches = []
+    if args.fuzz:
+        from tools import fuzz
+
+        cases, steps, _, seconds = fuzz.fuzz(args.fuzz, report=mismatches.append)
+        results["fuzz"] = {
+            "cases": cases,
+            "steps": steps,
+            "mismatches": len(mismatches),
+            "steps_per_minute": steps / seconds * 60,
+        }
+        print(f"{'fuzz/steps_per_minute':40} {steps / seconds * 60:12.0f}")
+    suite.dump(results, args.output)
+
+    failures = suite.over_budget(results)
+    for name, budget, seconds in failures:
+        print(f"OVER BUDGET {name}: {seconds:.3f} s > {budget:.3f} s")
+    for mismatch in mismatches:
+        case = f"{mismatch['engine']} seed {mismatch['seed']} case {mismatch['case']}"
+        print(f"MISMATCH {case}: {mismatch['commands']!r} on")
+        print(mismatch["layout"], end="")
+    if args.update_baseline:
+        if os.path.exists(args.baseline):
+            # cases left out of this run keep their reference
+            kept = suite.load(args.baseline)["results"]
+            results = {**results, "results": {**kept, **results["results"]}}
+        suite.dump(results, args.baseline)
+    elif os.path.exists(args.baseline):
+        regressions = suite.compare(results, suite.load(args.baseline), args.tolerance)
+        for name, reference, seconds in regressions:
+            print(
+                f"REGRESSION {name}: {reference * 1e6:.1f} us -> {seconds * 1e6:.1f} us"
+            )
+        failures += regressions
+    else:
+        print(f"No baseline at {args.baseline}")
+    return 1 if failures or mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
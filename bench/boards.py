@@ -0,0 +1,42 @@
+"""Generate walled square boards with a small scenario in the top left corner."""
+
+import os
+
+
+# each scenario has character 1 in the top left, to be moved right
+STAMPS = {
+    "step": ["1 "],
+    "push": ["1* "],
+    "fill": ["1*O"],
+    "turn": ["1/ ", " % "],
+    "blocked": ["1/#", " % "],
+}
+
+
+def turnstiles(size):
+    """Row of turnstiles across the board, each push turns the next one."""
+    count = (size - 3) // 2
+    return ["1" + "/ " * count, " %" * count]
+
+
+# scenarios spanning the whole board width
+RUNS = {"turnstiles": turnstiles}
+
+
+def layout(size, stamp):
+    """Return layout lines of a size x size board holding stamp."""
+    rows = [[" "] * size for _ in range(size)]
+    for i in range(size):
+        rows[i][0] = rows[i][-1] = rows[0][i] = rows[-1][i] = "#"
+    lines = STAMPS[stamp] if stamp in STAMPS else RUNS[stamp](size)
+    for i, line in enumerate(lines):
+        rows[1 + i][1 : 1 + len(line)] = line
+    return ["".join(row) for row in rows]
+
+
+def write(size, stamp, directory):
+    """Write board to directory and return its path."""
+    path = os.path.join(directory, f"{stamp}_{size}.txt")
+    with open(path, "w") as board:
+        print("\n".join(layout(size, stamp)), file=board)
+    return path
@@ -0,0 +1,167 @@
+"""Benchmark cases, machine-readable results and baseline comparison."""
+
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from control import Game
+from control.game import COMMANDS
+from model import Grid
+from . import boards
+
+
+SIZES = (16, 64, 256, 1000)
+BACKENDS = ("object", "compact")
+COMMAND_LENGTH = 2000
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# command line and keyboard input of each startup case, with its budget in seconds
+STARTUP = {
+    "startup/main-t": ([sys.executable, "main.py", "-t"], "q\n"),
+    "startup/import": ([sys.executable, "-c", "import model, control"], ""),
+}
+BUDGETS = {"startup/main-t": 1.0, "startup/import": 0.5}
+
+
+def measure(action, repeat, setup=None):
+    """Best time of one call of action over repeat calls, setup is not timed."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def walk(size):
+    """Commands walking character 1 back and forth along the top row."""
+    span = size - 3
+    commands = "1" + (">" * span + "<" * span) * (COMMAND_LENGTH // (2 * span) + 1)
+    return commands[:COMMAND_LENGTH]
+
+
+def startup(repeat=5):
+    """Yield (name, best seconds) of fresh interpreter startups."""
+    for name, (command, keys) in STARTUP.items():
+
+        def launch():
+            subprocess.run(
+                command,
+                input=keys,
+                cwd=ROOT,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+
+        yield name, measure(launch, repeat)
+
+
+def cases(sizes=SIZES, backends=BACKENDS):
+    """Yield (name, best seconds per call) of every case."""
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            slow = size >= 256
+            for backend in backends:
+                path = boards.write(size, "step", directory)
+                yield f"parse/{backend}/{size}", measure(
+                    lambda: Grid(path, backend=backend), 3 if slow else 20
+                )
+
+                for stamp in boards.STAMPS:
+                    grid = Grid(boards.write(size, stamp, directory), backend=backend)
+                    initial = grid.snapshot()
+                    move = measure(
+                        lambda: grid.move("1", COMMANDS[">"]),
+                        200,
+                        lambda: grid.restore(initial),
+                    )
+                    yield f"move/{stamp}/{backend}/{size}", move
+
+                grid = Grid(path, backend=backend)
+                yield f"str/{backend}/{size}", measure(
+                    lambda: str(grid), 3 if slow else 50
+                )
+
+                game = Game(grid, None)
+                initial = grid.snapshot()
+                commands = walk(size)
+                process = measure(
+                    lambda: game.process_input(commands),
+                    3,
+                    lambda: grid.restore(initial),
+                )
+                yield f"process_input/{backend}/{size}", process
+                run = measure(
+                    lambda: game.run(commands), 3, lambda: grid.restore(initial)
+                )
+                yield f"run/{backend}/{size}", run
+
+                grid = Grid(
+                    boards.write(size, "turnstiles", directory), backend=backend
+                )
+                game = Game(grid, None)
+                initial = grid.snapshot()
+                commands = "1" + ">" * ((size - 3) // 2)
+                process = measure(
+                    lambda: game.process_input(commands),
+                    3,
+                    lambda: grid.restore(initial),
+                )
+                yield f"process_input/turnstiles/{backend}/{size}", process
+
+
+def run(sizes=SIZES, backends=BACKENDS, report=print):
+    """Run all cases, report each one, return results document."""
+    results = {}
+    for name, seconds in itertools.chain(startup(), cases(sizes, backends)):
+        results[name] = seconds
+        report(f"{name:40} {seconds * 1e6:12.1f} us")
+    meta = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+    return {"meta": meta, "results": results}
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, baseline, current) of cases slower than baseline
+    by more than tolerance."""
+    regressions = []
+    for name, seconds in results["results"].items():
+        reference = baseline["results"].get(name)
+        if reference is not None and seconds > reference * (1 + tolerance):
+            regressions.append((name, reference, seconds))
+    return regressions
+
+
+def over_budget(results):
+    """Return (name, budget, current) of startup cases over their budget."""
+    budgets = [
+        (name, BUDGETS[name], results["results"][name])
+        for name in BUDGETS
+        if name in results["results"]
+    ]
+    return [
+        (name, budget, seconds) for name, budget, seconds in budgets if seconds > budget
+    ]
+
+
+def load(path):
+    with open(path) as document:
+        return json.load(document)
+
+
+def dump(results, path):
+    with open(path, "w") as document:
+        json.dump(results, document, indent=1, sort_keys=True)
@@ -1,48 +1,258 @@
 """mediate interactions between model (Grid) and view (App) in standard MVC fashion"""
 
 
+import heapq
+from collections import OrderedDict, namedtuple
+
+import numpy as np
 from .callback import observer
 
 
+COMMANDS = {"^": (-1, 0), ">": (0, 1), "v": (1, 0), "<": (0, -1)}
+SWITCHES = frozenset("1234")
+
+# status : "win", "dead", "quit" or None when commands ran out,
+# step : index of the command that ended the game, or command count,
+# active character and state hash of the grid at the end
+Outcome = namedtuple("Outcome", "status step active state_hash")
+
+# cells of the distance maps kept for goto
+MAP_CELLS = 1 << 22
+
+
+def _distance(distances, cell):
+    """Distance of cell in a map of Game._distances, None if unknown or off reach."""
+    top, left, plane = distances
+    i, j = cell[0] - top, cell[1] - left
+    if 0 <= i < plane.shape[0] and 0 <= j < plane.shape[1] and plane[i, j] >= 0:
+        return int(plane[i, j])
+    return None
+
+
 class Game:
     """create needed tools and start the game upon instanciation"""
 
     def __init__(self, grid, app_type):
         self.grid = grid
-        self.commands = {"^": (-1, 0), ">": (0, 1), "v": (1, 0), "<": (0, -1)}
+        self.commands = dict(COMMANDS)
         self.active_character = "1"
         self.app = app_type
+        # (before, after) grid records of each move, for undo and redo
+        self.history = []
+        self.future = []
+        # see replay.Recorder
+        self.recorder = None
+
+        # (obstacle hash, target) -> distances to target, see _distances
+        self._maps = OrderedDict()
+        self._map_cells = 0
+        # top left cell of the board shown by the app, see _view
+        self._origin = (0, 0)
+
+        # command -> handler returning the status it ends the game with, if any
+        self._handlers = {"q": lambda: "quit", "u": self.undo, "r": self.redo}
+        for command in SWITCHES:
+            self._handlers[command] = self._switcher(command)
+        for command, direction in self.commands.items():
+            self._handlers[command] = self._mover(direction)
 
     @observer
     def callback(self, key):
-        """pass key callback to model and update view"""
-        self.process_input([key])
-        self.app.update(str(self.grid), self.active_character)
+        """pass key callback to model and update view,
+        a (row, column) key of the cells shown walks the active character there"""
+        if isinstance(key, tuple):
+            self.goto((key[0] + self._origin[0], key[1] + self._origin[1]))
+        else:
+            self.process_input([key])
+        self.app.update(self._view(), self.active_character)
 
-        if key in map(str, range(1, 5)):
+        if key in SWITCHES:
             key = str(int(key) % len(self.grid.characters) + 1)
         return key
 
-    def process_input(self, commands):
-        """Interpret a chain of user input and pass orders to grid."""
-        for command in commands:
-            dead = close = win = False
-            if command == "q":
-                close = True
-            elif command in map(str, range(1, 5)):
-                self.active_character = command
-            elif self.active_character is None:
+    def _switcher(self, character):
+        def switch():
+            self.active_character = character
+
+        return switch
+
+    def _mover(self, direction):
+        def move():
+            if self.active_character is None:
                 raise Exception("No character is active")
-            elif command in self.commands:
-                win = self.grid.move(self.active_character, self.commands[command])
-                dead = all(not char.is_active for char in self.grid.characters.values())
+            character = self.grid.characters.get(self.active_character)
+            if character is None:
+                # switched to a character the level lacks,
+                # it stays put like a fallen one
+                return None
+            alive = character.is_active
+            win = self.grid.move(self.active_character, direction)
+            self._record()
+            if win:
+                return "win"
+            # only the moving character may fall, the others are checked when it does
+            if alive and not character.is_active:
+                if not any(other.is_active for other in self.grid.characters.values()):
+                    return "dead"
+            return None
+
+        return move
 
-            if win or dead or close and self.app is not None:
+    def _step(self, command):
+        """Apply one command, return the status it ends the game with, if any."""
+        handler = self._handlers.get(command)
+        status = handler() if handler is not None else None
+        if self.recorder is not None:
+            self.recorder.log(command)
+        return status
+
+    def process_input(self, commands):
+        """Interpret a chain of user input and pass orders to grid.
+        The app is told each time a command wins, kills the last character or quits."""
+        for command in commands:
+            if self._step(command) is not None and self.app is not None:
                 self.app.game_over()
 
+    def run(self, commands):
+        """Play commands without any view until the game ends or commands run out,
+        return an Outcome."""
+        for step, command in enumerate(commands):
+            status = self._step(command)
+            if status is not None:
+                return Outcome(
+                    status, step, self.active_character, self.grid.state_hash
+                )
+        return Outcome(None, len(commands), self.active_character, self.grid.state_hash)
+
+    def _record(self):
+        """Stack last grid move if it changed anything."""
+        if (
+            self.grid.last_move is not None
+            and self.grid.last_move[0] != self.grid.last_move[1]
+        ):
+            self.history.append(self.grid.last_move)
+            self.future.clear()
+
+    def undo(self):
+        """Revert last move, only items it changed are restored."""
+        if self.history:
+            before, after = self.history.pop()
+            self.grid.restore(before)
+            self.future.append((before, after))
+
+    def redo(self):
+        """Replay last undone move."""
+        if self.future:
+            before, after = self.future.pop()
+            self.grid.restore(after)
+            self.history.append((before, after))
+
+    def _distances(self, target, start, blocked=frozenset()):
+        """Steps to target cell without pushing, turning or winning on the way,
+        of the cells searched to reach start cell : (top, left, plane) of their box,
+        -1 elsewhere.
+        Characters are walked through, unless standing on blocked cells.
+        Maps without blocked cells are cached until a crate, hole or arm changes."""
+        key = self.grid.obstacle_hash, target
+        if not blocked and key in self._maps:
+            self._maps.move_to_end(key)
+            if _distance(self._maps[key], start) is not None:
+                return self._maps[key]
+
+        # A* from target towards start, cells are closed with their exact distance
+        si, sj = start
+        frontier = [(abs(target[0] - si) + abs(target[1] - sj), 0, target)]
+        steps, distances = {target: 0}, {}
+        while frontier and start not in distances:
+            _, depth, cell = heapq.heappop(frontier)
+            if cell in distances:
+                continue
+            distances[cell] = -depth
+            step = 1 - depth
+            i, j = cell
+            for di, dj in COMMANDS.values():
+                near = i + di, j + dj
+                if near in blocked or steps.get(near, step + 1) <= step:
+                    continue
+                inside = (
+                    0 <= near[0] < self.grid.height and 0 <= near[1] < self.grid.width
+                )
+                if inside and self.grid.walkable(near):
+                    steps[near] = step
+                    # deeper cells first among equal estimates
+                    estimate = step + abs(near[0] - si) + abs(near[1] - sj)
+                    heapq.heappush(frontier, (estimate, -step, near))
+
+        cells = np.array(list(distances), int).reshape(-1, 2)
+        (top, left), (bottom, right) = cells.min(axis=0), cells.max(axis=0)
+        plane = np.full((bottom - top + 1, right - left + 1), -1, np.int32)
+        plane[cells[:, 0] - top, cells[:, 1] - left] = list(distances.values())
+        distances = top, left, plane
+        if not blocked:
+            if key in self._maps:
+                self._map_cells -= self._maps.pop(key)[2].size
+            self._maps[key] = distances
+            self._map_cells += plane.size
+            while self._map_cells > MAP_CELLS and len(self._maps) > 1:
+                self._map_cells -= self._maps.popitem(last=False)[1][2].size
+        return distances
+
+    def path(self, target):
+        """Commands walking the active character to target cell along a shortest path
+        that neither pushes crates nor turns turnstiles, None if there is none."""
+        characters = self.grid.characters
+        character = characters.get(self.active_character)
+        if character is None or not character.is_active:
+            return None
+        start, target = tuple(character.coords), tuple(target)
+        if not (self.grid.walkable(target) or str(self.grid.observe(target)) == "@"):
+            return None
+        others = {tuple(c.coords) for c in characters.values() if c.is_active} - {start}
+
+        for blocked in (frozenset(), frozenset(others)):
+            distances = self._distances(target, start, blocked)
+            if _distance(distances, start) is None:
+                return None
+            commands, cell = [], start
+            while cell != target:
+                steps = []
+                for command, (di, dj) in COMMANDS.items():
+                    distance = _distance(distances, (cell[0] + di, cell[1] + dj))
+                    if distance is not None:
+                        steps.append((distance, command))
+                command = min(steps)[1]
+                cell = cell[0] + COMMANDS[command][0], cell[1] + COMMANDS[command][1]
+                if cell in others:
+                    break
+                commands.append(command)
+            else:
+                return "".join(commands)
+        return None
+
+    def goto(self, target):
+        """Walk the active character to target cell, see path.
+        return the commands played, None if target is out of reach."""
+        commands = self.path(target)
+        if commands is not None:
+            self.process_input(commands)
+        return commands
+
+    def _view(self):
+        """Board text for the app. An app with a viewport (rows, columns) only gets
+        the cells it has room for, around the active character."""
+        viewport = getattr(self.app, "viewport", None)
+        if viewport is None:
+            return str(self.grid)
+        character = self.grid.characters.get(self.active_character)
+        # switched to a character the level lacks : the cells shown stay the same
+        coords = self._origin if character is None else character.coords
+        window = self.grid.window(coords, viewport, self._origin)
+        self._origin = window[:2]
+        return self.grid.render(window)
+
     def play(self):
         """Launch the interactive game"""
         shape = (self.grid.height, self.grid.width)
         self.app = self.app(self.callback, shape, self.commands)
-        self.app.update(str(self.grid), self.active_character)
+        self.app.update(self._view(), self.active_character)
         self.app.launch()
@@ -0,0 +1,289 @@
+"""Record game sessions as compact binary replays, verify and seek them headless.
+
+File layout :
+    header      : magic, format version, layout digest, initial state hash,
+                  command count, slot count, checkpoint interval, name lengths
+    names       : level identifier and backend name
+    slots       : commands packed 3 bits each, lowest bits first
+    checkpoints : step, active character, state hash, grid record and undo stacks
+A slot holds a direction (0 to 3), a switch marker (4) followed by a slot with
+the character index, undo (5), redo (6) or quit (7).
+Undo stacks are written as changes since the previous checkpoint.
+"""
+
+import multiprocessing
+import os
+import struct
+import time
+
+import numpy as np
+from model import Grid
+from model import layout
+from .game import Game
+
+
+MAGIC = b"KWRP"
+VERSION = 1
+HEADER = struct.Struct("<4sH16sQIIIHH")
+# step, active character index, state hash
+CHECKPOINT = struct.Struct("<IBQ")
+SIZE = struct.Struct("<I")
+
+SLOTS = {"^": 0, ">": 1, "v": 2, "<": 3, "u": 5, "r": 6, "q": 7}
+SWITCH = 4
+SWITCHES = "1234"
+# slot -> command byte, characters are read from the slot after a marker
+COMMAND_TABLE = np.frombuffer(b"^>v<?urq", np.uint8)
+
+
+class ReplayMismatch(Exception):
+    """Replayed game does not match the recording."""
+
+
+def _encode(commands):
+    """Pack commands into 3 bit slots, return (slot count, bytes)."""
+    slots = []
+    for command in commands:
+        if command in SWITCHES:
+            slots += [SWITCH, SWITCHES.index(command)]
+        else:
+            slots.append(SLOTS[command])
+    bits = (np.array(slots, np.uint8)[:, None] >> np.arange(3, dtype=np.uint8)) & 1
+    return len(slots), np.packbits(bits.ravel(), bitorder="little").tobytes()
+
+
+def _decode(count, data):
+    """Unpack count slots into a command list."""
+    bits = np.unpackbits(
+        np.frombuffer(data, np.uint8), count=3 * count, bitorder="little"
+    )
+    slots = bits.reshape(-1, 3) @ np.array([1, 2, 4], np.uint8)
+    marker = slots == SWITCH
+    character = np.zeros_like(marker)
+    character[1:] = marker[:-1]
+    commands = np.where(character, slots + ord(SWITCHES[0]), COMMAND_TABLE[slots])
+    return list(commands[~marker].astype(np.uint8).tobytes().decode())
+
+
+def _write_record(out, record):
+    """Append grid record (bytes or tuple of bytes) to out."""
+    parts = [record] if isinstance(record, bytes) else record
+    out += bytes([isinstance(record, bytes), len(parts)])
+    for part in parts:
+        out += SIZE.pack(len(part)) + part
+
+
+def _read_record(data, offset):
+    """Return grid record starting at offset and the offset after it."""
+    plain, count = data[offset], data[offset + 1]
+    offset += 2
+    parts = []
+    for _ in range(count):
+        (size,) = SIZE.unpack_from(data, offset)
+        parts.append(bytes(data[offset + SIZE.size : offset + SIZE.size + size]))
+        offset += SIZE.size + size
+    return (parts[0] if plain else tuple(parts)), offset
+
+
+def _common(stack, previous):
+    """Length of the prefix stack shares with previous, entries compared by value :
+    records taken again, or read back from a file, are still shared."""
+    length = 0
+    for entry, old in zip(stack, previous):
+        if entry != old:
+            break
+        length += 1
+    return length
+
+
+class Replay:
+    """Commands of one session on a level and checkpoints of the game on the way.
+    A checkpoint is (step, active character, state hash, grid record, history, future).
+    """
+
+    def __init__(self, level, backend="object", interval=256):
+        self.level = level
+        self.backend = backend
+        self.interval = interval
+        self.digest = layout.digest(level)
+        self.state_hash = None
+        self.commands = []
+        self.checkpoints = []
+
+    def save(self, path):
+        count, slots = _encode(self.commands)
+        level, backend = self.level.encode(), self.backend.encode()
+        out = bytearray(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                self.digest,
+                self.state_hash,
+                len(self.commands),
+                count,
+                self.interval,
+                len(level),
+                len(backend),
+            )
+        )
+        out += level + backend + slots
+        out += SIZE.pack(len(self.checkpoints))
+        previous = [], []
+        for step, active, state_hash, record, *stacks in self.checkpoints:
+            out += CHECKPOINT.pack(step, SWITCHES.index(active), state_hash)
+            _write_record(out, record)
+            for stack, old in zip(stacks, previous):
+                keep = _common(stack, old)
+                out += SIZE.pack(keep) + SIZE.pack(len(stack) - keep)
+                for before, after in stack[keep:]:
+                    _write_record(out, before)
+                    _write_record(out, after)
+            previous = stacks
+        with open(path, "wb") as replay_file:
+            replay_file.write(out)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as replay_file:
+            data = memoryview(replay_file.read())
+        magic, version, digest, state_hash, length, count, interval, level, backend = (
+            HEADER.unpack_from(data)
+        )
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        offset = HEADER.size
+        names = bytes(data[offset : offset + level + backend]).decode()
+        offset += level + backend
+
+        replay = cls.__new__(cls)
+        replay.level, replay.backend = names[:level], names[level:]
+        replay.interval, replay.digest, replay.state_hash = interval, digest, state_hash
+        size = (3 * count + 7) // 8
+        replay.commands = _decode(count, data[offset : offset + size])
+        if len(replay.commands) != length:
+            raise ValueError(f"{path} is truncated")
+        offset += size
+
+        replay.checkpoints = []
+        (checkpoints,) = SIZE.unpack_from(data, offset)
+        offset += SIZE.size
+        previous = [], []
+        for _ in range(checkpoints):
+            step, active, hashed = CHECKPOINT.unpack_from(data, offset)
+            record, offset = _read_record(data, offset + CHECKPOINT.size)
+            stacks = []
+            for old in previous:
+                keep, added = struct.unpack_from("<II", data, offset)
+                offset += 8
+                stack = old[:keep]
+                for _ in range(added):
+                    before, offset = _read_record(data, offset)
+                    after, offset = _read_record(data, offset)
+                    stack.append((before, after))
+                stacks.append(stack)
+            replay.checkpoints.append((step, SWITCHES[active], hashed, record, *stacks))
+            previous = stacks
+        return replay
+
+    def game(self, level=None):
+        """New headless game on the recorded level,
+        or on level holding the same layout."""
+        level = level or self.level
+        if layout.digest(level) != self.digest:
+            raise ReplayMismatch(f"{level} is not the recorded level")
+        game = Game(Grid(level, backend=self.backend), None)
+        if game.grid.state_hash != self.state_hash:
+            raise ReplayMismatch(f"{level} does not start in the recorded state")
+        return game
+
+    def seek(self, step, level=None):
+        """Headless game as it was after step commands,
+        restored from the closest checkpoint then played forward."""
+        game = self.game(level)
+        checkpoint = max(
+            (c for c in self.checkpoints if c[0] <= step),
+            key=lambda c: c[0],
+            default=None,
+        )
+        start = 0
+        if checkpoint is not None:
+            start, game.active_character, _, record, history, future = checkpoint
+            game.grid.restore(record)
+            game.history, game.future = list(history), list(future)
+        game.process_input(self.commands[start:step])
+        return game
+
+    def verify(self, level=None):
+        """Replay every command, raise ReplayMismatch at the first checkpoint not met.
+        return the game in its final state."""
+        game = self.game(level)
+        start = 0
+        checkpoints = sorted(self.checkpoints, key=lambda c: c[0])
+        for step, active, state_hash, *_ in checkpoints:
+            game.process_input(self.commands[start:step])
+            start = step
+            if (game.grid.state_hash, game.active_character) != (state_hash, active):
+                raise ReplayMismatch(f"state differs from checkpoint at step {step}")
+        game.process_input(self.commands[start:])
+        return game
+
+
+class Recorder:
+    """Log commands processed by game into a replay.
+    Keys that are no commands are left out.
+    """
+
+    def __init__(self, game, level, backend="object", interval=256):
+        self.game = game
+        self.replay = Replay(level, backend, interval)
+        self.replay.state_hash = game.grid.state_hash
+        self.replay.checkpoints.append(self._checkpoint())
+        game.recorder = self
+
+    def _checkpoint(self):
+        game = self.game
+        step = len(self.replay.commands)
+        return (
+            step,
+            game.active_character,
+            game.grid.state_hash,
+            game.grid.snapshot(),
+            list(game.history),
+            list(game.future),
+        )
+
+    def log(self, command):
+        if command not in SLOTS and command not in SWITCHES:
+            return
+        self.replay.commands.append(command)
+        if len(self.replay.commands) % self.replay.interval == 0:
+            self.replay.checkpoints.append(self._checkpoint())
+
+    def save(self, path):
+        """Write the replay, ending with a checkpoint of the current state
+        so that verifying checks the commands after the last interval too."""
+        if self.replay.checkpoints[-1][0] != len(self.replay.commands):
+            self.replay.checkpoints.append(self._checkpoint())
+        self.replay.save(path)
+
+
+def _verify(path):
+    start = time.perf_counter()
+    try:
+        Replay.load(path).verify()
+        error = None
+    except (ReplayMismatch, ValueError, OSError) as mismatch:
+        error = str(mismatch)
+    return path, error, time.perf_counter() - start
+
+
+def verify_directory(directory, processes=None):
+    """Verify every .kwr replay of directory in parallel,
+    yield (path, error message or None, seconds) as each one is done."""
+    paths = [
+        os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".kwr")
+    ]
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap_unordered(_verify, paths)
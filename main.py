@@ -1,6 +1,9 @@
 #!/usr/bin/env python3.7
-"""flags : -t for command line gameplay, GUI by default"""
+"""flags : -t for command line gameplay, -g for GUI, -s to serve sessions over a socket,
+curses by default
+level : layout file or pack:level identifier, model/grid.txt by default"""
 
+import argparse
 import os
 import sys
 from control import Game
@@ -9,14 +12,58 @@ from view import App
 
 
 def main():
-    try:
-        key = sys.argv[1].split("-", 1)[1]
-    except:
-        key = "c"
+    parser = argparse.ArgumentParser(description=__doc__)
+    apps = parser.add_mutually_exclusive_group()
+    for key in "tcgs":
+        apps.add_argument(f"-{key}", dest="app", action="store_const", const=key)
+    parser.add_argument("level", nargs="?", default=os.getcwd() + "/model/grid.txt")
+    parser.add_argument(
+        "--backend",
+        choices=sorted(Grid.backends),
+        default="object",
+        help="grid storage, chunked for very large maps",
+    )
+    parser.add_argument(
+        "--record", metavar="REPLAY", help="save the session as a replay file"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        nargs="?",
+        const="-",
+        help="time model and view calls, "
+        "print a summary on exit or write a Chrome trace to TRACE (.json)",
+    )
+    args = parser.parse_args()
+
+    app = App(args.app or "c")
+    profile = None
+    if args.profile is not None:
+        from model import instrument
 
-    path = os.getcwd() + "/model/grid.txt"
+        profile = instrument.Profile(trace=args.profile.endswith(".json"))
+        profile.install(
+            instrument.targets()
+            + [(Game, "process_input"), (Game, "run"), (app, "update")]
+        )
 
-    Game(Grid(path), App(key)).play()
+    game = Game(Grid(args.level, backend=args.backend), app)
+    recorder = None
+    if args.record is not None:
+        from control.replay import Recorder
+
+        recorder = Recorder(game, args.level, args.backend)
+    try:
+        game.play()
+    finally:
+        if recorder is not None:
+            recorder.save(args.record)
+        if profile is not None:
+            profile.uninstall()
+            if profile.trace:
+                profile.dump(args.profile)
+            else:
+                print(profile.table(), file=sys.stderr)
 
 
 if __name__ == "__main__":
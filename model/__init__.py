@@ -1,3 +1,5 @@
-"""Only give Grid to client"""
+"""Only give Grid to client, storage engines register themselves"""
 
 from .grid import Grid
+from . import compact
+from . import chunked
@@ -0,0 +1,83 @@
+"""Static analysis of a layout, run once and shared by search, hints and validation.
+A crate only leaves play by filling a hole, so a crate that can no longer reach one
+is of no use : such states may be pruned by features that assume crates are meant
+for holes.
+"""
+
+from collections import deque
+
+import numpy as np
+from .layout import WALL, DOOR, HOLE, PIVOT
+
+
+# a crate can neither enter nor be pushed from these, whatever happens on the board
+STATIC = (WALL, DOOR, PIVOT)
+DIRECTIONS = ((-1, 0), (0, 1), (1, 0), (0, -1))
+
+
+def dead_squares(blueprint):
+    """Boolean plane of cells from which a crate can never be pushed into a hole.
+    Crates are pulled backwards from every hole : a crate at cell reaches next cell
+    when the pusher may stand on the other side. Walls are not dead squares.
+    """
+    height, width = blueprint.shape
+    free = ~np.isin(blueprint, STATIC)
+    live = blueprint == HOLE
+    queue = deque(map(tuple, np.argwhere(live).tolist()))
+    while queue:
+        i, j = queue.popleft()
+        for di, dj in DIRECTIONS:
+            crate, pusher = (i - di, j - dj), (i - 2 * di, j - 2 * dj)
+            if not (0 <= pusher[0] < height and 0 <= pusher[1] < width):
+                continue
+            if free[crate] and free[pusher] and not live[crate]:
+                live[crate] = True
+                queue.append(crate)
+    return free & ~live
+
+
+def frozen(crates, blueprint, dead, cell):
+    """Whether crate at cell can never be pushed again.
+    A crate is stuck along an axis against a wall, between two dead squares,
+    or next to a crate stuck along the other axis. crates is the set of crate cells.
+    """
+
+    def stuck(cell, axis, seen):
+        i, j = cell
+        di, dj = (1, 0) if axis == 0 else (0, 1)
+        sides = (i - di, j - dj), (i + di, j + dj)
+        if any(blueprint[side] in STATIC for side in sides):
+            return True
+        if all(dead[side] for side in sides):
+            return True
+        # a crate checked already counts as a wall, this breaks cycles
+        seen = seen | {cell}
+        for side in sides:
+            if side in seen or side in crates and stuck(side, 1 - axis, seen):
+                return True
+        return False
+
+    return stuck(cell, 0, frozenset()) and stuck(cell, 1, frozenset())
+
+
+def reachable(free, starts):
+    """Boolean plane of free cells connected to any of starts cells."""
+    height, width = free.shape
+    seen = np.zeros(free.shape, bool)
+    queue = deque()
+    for cell in starts:
+        seen[cell] = True
+        queue.append(cell)
+    while queue:
+        i, j = queue.popleft()
+        for di, dj in DIRECTIONS:
+            cell = i + di, j + dj
+            if (
+                0 <= cell[0] < height
+                and 0 <= cell[1] < width
+                and free[cell]
+                and not seen[cell]
+            ):
+                seen[cell] = True
+                queue.append(cell)
+    return seen
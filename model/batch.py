@@ -0,0 +1,152 @@
+"""Play many boards of the same layout in lockstep."""
+
+import copy
+import numpy as np
+from .compact import CompactGrid
+from .layout import EMPTY, DOOR, CHARACTER, HOLE, CRATE, ARM
+
+
+DIRECTIONS = {"^": (-1, 0), ">": (0, 1), "v": (1, 0), "<": (0, -1)}
+
+
+class Batch:
+    """Stack compact planes of size boards and apply one command per board per step.
+    Boards stop at their first win, death or quit, as the interactive game would.
+    Turnstiles are turned board by board, everything else is vectorized.
+    Undo and redo are not supported.
+    """
+
+    def __init__(self, layout_path, size):
+        self.template = CompactGrid(layout_path)
+        self.size = size
+
+        def stack(array):
+            return np.repeat(array[None], size, axis=0)
+
+        self.codes = stack(self.template.codes)
+        self.versions = stack(self.template.versions)
+        self.owner = stack(self.template.owner)
+        self.positions = stack(self.template.positions)
+        self.alive = stack(self.template.alive)
+        self.active = np.zeros(size, int)
+        self.won = np.zeros(size, bool)
+        self.dead = np.zeros(size, bool)
+        self.quit = np.zeros(size, bool)
+
+        # single board view over the stacks, for turnstiles
+        self._board = copy.copy(self.template)
+
+        self._offsets = np.zeros((128, 2), int)
+        self._moving = np.zeros(128, bool)
+        for command, direction in DIRECTIONS.items():
+            self._offsets[ord(command)] = direction
+            self._moving[ord(command)] = True
+
+    @property
+    def running(self):
+        return ~(self.won | self.dead | self.quit)
+
+    def _refresh(self, boards, i, j):
+        """Vectorized CompactGrid._refresh of cell (i, j) on each of boards."""
+        code = self.template.floor[i, j]
+        version = np.zeros(len(boards), np.int8)
+        rank = np.where(code != EMPTY, i * self.template.width + j, -1)
+        for index, character_rank in enumerate(self.template.ranks):
+            here = self.alive[boards, index] & (character_rank > rank)
+            position = self.positions[boards, index]
+            here &= (position[:, 0] == i) & (position[:, 1] == j)
+            code = np.where(here, CHARACTER, code)
+            version = np.where(here, index, version)
+            rank = np.where(here, character_rank, rank)
+        self.codes[boards, i, j] = code
+        self.versions[boards, i, j] = version
+
+    def _relocate(self, boards, coords, alive=True):
+        """Vectorized CompactGrid._relocate of active characters."""
+        index = self.active[boards]
+        old = self.positions[boards, index].T
+        self.positions[boards, index] = coords.T
+        self.alive[boards, index] = alive
+        self._refresh(boards, *old)
+        if alive:
+            self._refresh(boards, *coords)
+
+    def _turn(self, board, target, direction):
+        """Let board view handle a turnstile push."""
+        view = self._board
+        view.codes, view.versions, view.owner = (
+            self.codes[board],
+            self.versions[board],
+            self.owner[board],
+        )
+        view.positions, view.alive = self.positions[board], self.alive[board]
+        view._turn(self.active[board], view.owner[tuple(target)] - 1, tuple(direction))
+
+    def step(self, commands):
+        """Apply one command (character) to each board."""
+        keys = np.frombuffer(commands.encode("ascii"), np.uint8)
+        running = self.running
+
+        self.quit |= running & (keys == ord("q"))
+        switch = running & (keys >= ord("1")) & (keys <= ord("4"))
+        self.active[switch] = keys[switch] - ord("1")
+
+        boards = np.flatnonzero(running & self._moving[keys])
+        boards = boards[self.alive[boards, self.active[boards]]]
+        direction = self._offsets[keys[boards]]
+        target = (self.positions[boards, self.active[boards]] + direction).T
+        code = self.codes[boards, target[0], target[1]]
+        attached = self.owner[boards, target[0], target[1]] > 0
+
+        walk = (code == EMPTY) | (code == DOOR) | (code == ARM) & ~attached
+        self._relocate(boards[walk], target[:, walk])
+        self.won[boards[code == DOOR]] = True
+
+        fall = code == HOLE
+        self._relocate(boards[fall], target[:, fall], alive=False)
+
+        push = code == CRATE
+        self._push(boards[push], target[:, push], direction[push])
+
+        turn = (code == ARM) & attached
+        for board, cell, offset in zip(boards[turn], target.T[turn], direction[turn]):
+            self._turn(board, cell, offset)
+
+        self.dead[boards] |= ~self.alive[boards].any(axis=1)
+
+    def _push(self, boards, target, direction):
+        """Vectorized CompactGrid._push."""
+        beyond = target + direction.T
+        code = self.codes[boards, beyond[0], beyond[1]]
+        depth = self.versions[boards, beyond[0], beyond[1]]
+
+        hole = code == HOLE
+        fall = hole & (depth > 0)
+        depth = np.where(fall, depth - 1, depth)
+        filled = hole & (depth <= 0)
+        self.versions[boards[hole], beyond[0][hole], beyond[1][hole]] = depth[hole]
+        self.codes[boards[filled], beyond[0][filled], beyond[1][filled]] = EMPTY
+        self.versions[boards[filled], beyond[0][filled], beyond[1][filled]] = 0
+
+        slide = code == EMPTY
+        self.codes[boards[slide], beyond[0][slide], beyond[1][slide]] = CRATE
+
+        moved = slide | fall
+        self.codes[boards[moved], target[0][moved], target[1][moved]] = EMPTY
+        self._relocate(boards[moved], target[:, moved])
+
+    def run(self, command_strings):
+        """Play one command string per board, shorter ones are padded with no-ops.
+        return won and dead flags of each board.
+        """
+        length = max(map(len, command_strings), default=0)
+        padded = [commands.ljust(length) for commands in command_strings]
+        for step in range(length):
+            self.step("".join(commands[step] for commands in padded))
+        return self.won.copy(), self.dead.copy()
+
+
+def simulate(layout_path, command_strings):
+    """Play each command string on its own board of given layout,
+    return won and dead flags of each board."""
+    return Batch(layout_path, len(command_strings)).run(command_strings)
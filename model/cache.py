@@ -0,0 +1,128 @@
+"""Results of expensive work on levels kept on disk across runs and processes.
+
+Entries are keyed by the parsed level (layout, current state and active character)
+and the engine version, so renaming or reformatting a level keeps its entries
+and a change of game rules drops them. The store is one SQLite file
+in write-ahead log mode, shared safely by concurrent processes.
+Least recently used entries are evicted beyond limit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+
+# bump whenever moves may play out differently, cached results are then ignored
+ENGINE = 1
+SCHEMA = """
+create table if not exists entries (
+    key text not null,
+    kind text not null,
+    value text not null,
+    used real not null,
+    primary key (key, kind)
+);
+create index if not exists entries_used on entries (used);
+"""
+
+
+def key(grid, active="1"):
+    """Fingerprint of grid layout, grid state and active character."""
+    fingerprint = hashlib.blake2b(digest_size=16)
+    blueprint = np.ascontiguousarray(np.asarray(grid.blueprint), np.int8)
+    fingerprint.update(
+        f"{ENGINE} {grid.height} {grid.width} {grid.state_hash} {active}\n".encode()
+    )
+    fingerprint.update(blueprint.tobytes())
+    return fingerprint.hexdigest()
+
+
+class Cache:
+    """JSON values by (key, kind) in a SQLite file.
+    Connections are opened on first use in each process,
+    a cache may be handed to workers.
+    """
+
+    def __init__(self, path, limit=100000):
+        self.path = path
+        self.limit = limit
+        self._connection = None
+        self._pid = None
+
+    def __getstate__(self):
+        return {
+            "path": self.path,
+            "limit": self.limit,
+            "_connection": None,
+            "_pid": None,
+        }
+
+    @property
+    def connection(self):
+        if self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # wait for other writers rather than fail
+            self._connection = sqlite3.connect(
+                self.path, timeout=60, isolation_level=None
+            )
+            self._connection.execute("pragma journal_mode=wal")
+            self._connection.execute("pragma synchronous=normal")
+            self._connection.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._connection
+
+    def get(self, key, kind):
+        """Value stored for key and kind, None if there is none."""
+        connection = self.connection
+        row = connection.execute(
+            "select value from entries where key = ? and kind = ?", (key, kind)
+        ).fetchone()
+        if row is None:
+            return None
+        connection.execute(
+            "update entries set used = ? where key = ? and kind = ?",
+            (time.time(), key, kind),
+        )
+        return json.loads(row[0])
+
+    def put(self, key, kind, value):
+        """Store value for key and kind,
+        evicting least recently used entries beyond limit."""
+        connection = self.connection
+        connection.execute("begin immediate")
+        try:
+            connection.execute(
+                "insert or replace into entries values (?, ?, ?, ?)",
+                (key, kind, json.dumps(value), time.time()),
+            )
+            (count,) = connection.execute("select count(*) from entries").fetchone()
+            if count > self.limit:
+                connection.execute(
+                    "delete from entries where rowid in"
+                    " (select rowid from entries order by used limit ?)",
+                    (count - self.limit,),
+                )
+            connection.execute("commit")
+        except BaseException:
+            connection.execute("rollback")
+            raise
+
+    def __len__(self):
+        return self.connection.execute("select count(*) from entries").fetchone()[0]
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = self._pid = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
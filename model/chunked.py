@@ -0,0 +1,305 @@
+"""Sparse grid storage for very large maps : planes cut into square tiles,
+a tile holding one value everywhere (all wall, all floor) is kept as that value.
+"""
+
+from functools import cached_property
+from itertools import product
+
+import numpy as np
+from .compact import CompactGrid, ORIENTATIONS, _Piece
+from .grid import Grid
+from .layout import EMPTY, WALL, DOOR, CHARACTER, HOLE, CRATE, ARM, PIVOT
+from . import analysis
+from . import layout
+
+
+# tile side, a power of two
+SHIFT = 6
+CHUNK = 1 << SHIFT
+MASK = CHUNK - 1
+# first cell index of a whole board record
+FULL = np.int32(-1).tobytes()
+
+
+def _pack(tile):
+    """Tile array, or its only value."""
+    first = tile.flat[0]
+    return first.item() if (tile == first).all() else tile
+
+
+class Plane:
+    """2D plane of small integers stored by tiles of CHUNK x CHUNK cells.
+    Cells are read with plane[i, j] or sliced into dense arrays,
+    indices are non-negative.
+    An overlay plane reads missing tiles from its base and copies them on first write.
+    """
+
+    def __init__(self, shape, dtype, fill=0, base=None):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.fill = fill
+        self.base = base
+        self.tiles = {}
+
+    def keys(self):
+        """Every tile of the plane."""
+        return product(
+            range(-(-self.shape[0] // CHUNK)), range(-(-self.shape[1] // CHUNK))
+        )
+
+    def tile(self, key):
+        """Array or single value of tile key."""
+        tile = self.tiles.get(key)
+        if tile is None:
+            return self.base.tile(key) if self.base is not None else self.fill
+        return tile
+
+    def __getitem__(self, key):
+        i, j = key if isinstance(key, tuple) else (key, slice(None))
+        try:
+            tile = self.tile((i >> SHIFT, j >> SHIFT))
+        except TypeError:
+            return self._slice(i, j)
+        return tile[i & MASK, j & MASK] if isinstance(tile, np.ndarray) else tile
+
+    def __setitem__(self, key, value):
+        i, j = key
+        tile_key = i >> SHIFT, j >> SHIFT
+        tile = self.tiles.get(tile_key)
+        if not isinstance(tile, np.ndarray):
+            tile = self.tile(tile_key)
+            if not isinstance(tile, np.ndarray):
+                if tile == value:
+                    return
+                tile = np.full((CHUNK, CHUNK), tile, self.dtype)
+            else:
+                tile = tile.copy()
+            self.tiles[tile_key] = tile
+        tile[i & MASK, j & MASK] = value
+
+    def window(self, top, left, height, width):
+        """Dense copy of a rectangle of the plane."""
+        dense = np.empty((height, width), self.dtype)
+        for ti in range(top >> SHIFT, (top + height - 1 >> SHIFT) + 1):
+            for tj in range(left >> SHIFT, (left + width - 1 >> SHIFT) + 1):
+                rows = slice(max(top, ti * CHUNK), min(top + height, (ti + 1) * CHUNK))
+                columns = slice(
+                    max(left, tj * CHUNK), min(left + width, (tj + 1) * CHUNK)
+                )
+                tile = self.tile((ti, tj))
+                if isinstance(tile, np.ndarray):
+                    tile = tile[
+                        rows.start & MASK : (rows.stop - 1 & MASK) + 1,
+                        columns.start & MASK : (columns.stop - 1 & MASK) + 1,
+                    ]
+                dense[
+                    rows.start - top : rows.stop - top,
+                    columns.start - left : columns.stop - left,
+                ] = tile
+        return dense
+
+    def _slice(self, i, j):
+        """Dense copy of rows and columns given each by an index or a slice."""
+        bounds = []
+        for index, size in zip((i, j), self.shape):
+            if isinstance(index, slice):
+                start, stop, step = index.indices(size)
+                bounds.append((start, max(stop - start, 0), slice(None, None, step)))
+            else:
+                bounds.append((index % size, 1, 0))
+        (top, height, rows), (left, width, columns) = bounds
+        if not height or not width:
+            return np.empty((height, width), self.dtype)[rows, columns]
+        return self.window(top, left, height, width)[rows, columns]
+
+    def __array__(self, dtype=None, copy=None):
+        dense = self.window(0, 0, *self.shape)
+        return dense if dtype is None else dense.astype(dtype)
+
+    def copy(self):
+        """Plane with the same content, tiles of base are shared."""
+        plane = Plane(self.shape, self.dtype, self.fill, self.base)
+        plane.tiles = {
+            key: tile.copy() if isinstance(tile, np.ndarray) else tile
+            for key, tile in self.tiles.items()
+        }
+        return plane
+
+
+@Grid.register("chunked")
+class ChunkedGrid(CompactGrid):
+    """Compact engine over tiled planes, for maps too large for dense arrays.
+    Only tiles with cells off their floor (crates, holes, arms, characters) or
+    changed since loading hold arrays of their own. The layout is decoded
+    CHUNK rows at a time.
+    """
+
+    def __init__(self, layout_path, check_wall=True, backend="chunked"):
+        text = layout.read(layout_path)
+        if not text.endswith("\n"):
+            text += "\n"
+        data = text.encode()
+        width = text.index("\n") + 1
+        if len(data) % width:
+            raise ValueError(f"Layout rows should have the same length : {layout_path}")
+        self.height, self.width = len(data) // width, width - 1
+        shape = self.height, self.width
+
+        self.blueprint = Plane(shape, np.int8, WALL)
+        static = Plane(shape, np.int8)
+        # tiles holding items that move or change
+        self._mobile = set()
+        pivots, characters = [], []
+        padded = -(-self.width // CHUNK) * CHUNK
+        for top in range(0, self.height, CHUNK):
+            rows = min(CHUNK, self.height - top)
+            band = np.frombuffer(data, np.uint8, rows * width, top * width).reshape(
+                rows, width
+            )
+            if (band[:, -1] != ord("\n")).any():
+                raise ValueError(
+                    f"Layout rows should have the same length : {layout_path}"
+                )
+            codes, versions = layout.decode(band[:, :-1])
+            pivots += (np.argwhere(codes == PIVOT) + (top, 0)).tolist()
+            characters += (np.argwhere(codes == CHARACTER) + (top, 0)).tolist()
+            codes = np.pad(
+                codes,
+                ((0, CHUNK - rows), (0, padded - self.width)),
+                constant_values=WALL,
+            )
+            versions = np.pad(versions, ((0, CHUNK - rows), (0, padded - self.width)))
+            for left in range(0, padded, CHUNK):
+                key = top >> SHIFT, left >> SHIFT
+                self.blueprint.tiles[key] = _pack(codes[:, left : left + CHUNK].copy())
+                static.tiles[key] = _pack(versions[:, left : left + CHUNK].copy())
+                if np.isin(
+                    codes[:, left : left + CHUNK], (CHARACTER, HOLE, CRATE, ARM)
+                ).any():
+                    self._mobile.add(key)
+
+        self.codes = Plane(shape, np.int8, base=self.blueprint)
+        self.versions = Plane(shape, np.int8, base=static)
+        self.pivots = np.array(pivots, int).reshape(-1, 2)
+        self.owner = Plane(shape, np.int32)
+        for index, (i, j) in enumerate(pivots):
+            for di, dj in ORIENTATIONS:
+                if self.codes[i + di, j + dj] == ARM:
+                    self.owner[i + di, j + dj] = index + 1
+
+        self.floor = Plane(shape, np.int8, WALL)
+        for key in self.blueprint.keys():
+            codes, owner = self.blueprint.tile(key), self.owner.tile(key)
+            if not isinstance(codes, np.ndarray):
+                self.floor.tiles[key] = (
+                    codes if codes in (WALL, DOOR, PIVOT, ARM) else EMPTY
+                )
+                continue
+            floor = np.where(np.isin(codes, (WALL, DOOR, PIVOT)), codes, EMPTY).astype(
+                np.int8
+            )
+            floor[(codes == ARM) & (owner == 0)] = ARM
+            self.floor.tiles[key] = _pack(floor)
+
+        self.positions = np.zeros((4, 2), int)
+        self.alive = np.zeros(4, bool)
+        self.ranks = np.zeros(4, int)
+        self.characters = {}
+        for i, j in characters:
+            index = self.versions[i, j]
+            self.positions[index] = i, j
+            self.alive[index] = True
+            self.ranks[index] = i * self.width + j
+            self.characters[str(index + 1)] = _Piece(self, index)
+
+        self.last_move = None
+        self.state_hash = self.obstacle_hash = 0
+        self._rehash((0, 0), self._digest(self.snapshot()))
+        if check_wall:
+            self._check_grid()
+
+    @cached_property
+    def dead_squares(self):
+        """Dense plane, see Grid.dead_squares."""
+        return analysis.dead_squares(np.asarray(self.blueprint))
+
+    def _loose(self):
+        """Flat indices of cells off their floor, in order."""
+        cells = [np.zeros(0, int)]
+        keys = self._mobile.union(
+            self.codes.tiles, self.versions.tiles, self.owner.tiles
+        )
+        for key in sorted(keys):
+            differ = np.asarray(self.codes.tile(key)) != self.floor.tile(key)
+            differ = (
+                differ
+                | (np.asarray(self.versions.tile(key)) != 0)
+                | (np.asarray(self.owner.tile(key)) != 0)
+            )
+            i, j = np.nonzero(np.broadcast_to(differ, (CHUNK, CHUNK)))
+            i, j = i + key[0] * CHUNK, j + key[1] * CHUNK
+            inside = (i < self.height) & (j < self.width)
+            cells.append(i[inside] * self.width + j[inside])
+        return np.sort(np.concatenate(cells))
+
+    def _record(self, select):
+        """Snapshot of flat cell indices select,
+        or of every cell off its floor for a slice.
+        Whole board records start their cell index with -1.
+        """
+        if isinstance(select, slice):
+            select = np.concatenate(([-1], self._loose()))
+        cells = [divmod(cell, self.width) for cell in select.tolist() if cell >= 0]
+        planes = [
+            np.array([plane[cell] for cell in cells], plane.dtype).tobytes()
+            for plane in (self.codes, self.versions, self.owner)
+        ]
+        return (
+            select.astype(np.int32).tobytes(),
+            *planes,
+            self.positions.tobytes(),
+            self.alive.tobytes(),
+        )
+
+    def _digest(self, record, characters=range(4)):
+        index, *rest = record
+        if index[:4] == FULL:
+            index = index[4:]
+        return super()._digest((index, *rest), characters)
+
+    def restore(self, record):
+        """Bring planes and characters back to a recorded state.
+        Cells off their floor missing from a whole board record go back to their floor.
+        """
+        index, *planes, positions, alive = record
+        select = np.frombuffer(index, np.int32)
+        planes = [
+            np.frombuffer(data, plane.dtype)
+            for plane, data in zip((self.codes, self.versions, self.owner), planes)
+        ]
+        if index[:4] == FULL:
+            select = select[1:]
+            extra = np.setdiff1d(self._loose(), select)
+            floor = np.array(
+                [self.floor[divmod(cell, self.width)] for cell in extra.tolist()],
+                np.int8,
+            )
+            select = np.concatenate((select, extra))
+            planes = [
+                np.concatenate((data, fill.astype(data.dtype)))
+                for data, fill in zip(planes, (floor, 0 * floor, 0 * floor))
+            ]
+            record = (
+                select.astype(np.int32).tobytes(),
+                *(data.tobytes() for data in planes),
+                positions,
+                alive,
+            )
+
+        self._rehash(self._digest(self._record(select)), self._digest(record))
+        cells = [divmod(cell, self.width) for cell in select.tolist()]
+        for plane, data in zip((self.codes, self.versions, self.owner), planes):
+            for cell, value in zip(cells, data.tolist()):
+                plane[cell] = value
+        self.positions[:] = np.frombuffer(positions, self.positions.dtype).reshape(4, 2)
+        self.alive[:] = np.frombuffer(alive, bool)
@@ -0,0 +1,328 @@
+"""Array-backed grid storage : type codes and versions instead of items."""
+
+import copy
+
+import numpy as np
+from .grid import Grid
+from .layout import EMPTY, WALL, DOOR, CHARACTER, HOLE, CRATE, ARM, PIVOT, SKIN_TABLE
+from . import hashing
+from . import layout
+
+
+# same order as Pivot.connect so shared arms end up with the same owner
+ORIENTATIONS = ((0, 1), (0, -1), (-1, 0), (1, 0))
+
+
+class _Piece:
+    """Character view over the compact tables, mimics item attributes."""
+
+    __slots__ = ("grid", "index")
+
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
+
+    @property
+    def coords(self):
+        return tuple(self.grid.positions[self.index])
+
+    @property
+    def is_active(self):
+        return bool(self.grid.alive[self.index])
+
+    def __str__(self):
+        return str(self.index + 1)
+
+
+@Grid.register("compact")
+class CompactGrid(Grid):
+    """Hold grid content as planes of small integers.
+    codes : type of the visible item, versions : hole depth or character id,
+    floor : static item left under a character (door or loose arm),
+    owner : 1 + index of the pivot an arm is attached to.
+    """
+
+    def __init__(self, layout_path, check_wall=True, backend="compact"):
+        self.blueprint, self.versions = layout.decode(layout.load(layout_path))
+        self.codes = self.blueprint.copy()
+        self.height, self.width = self.codes.shape
+
+        self.pivots = np.argwhere(self.codes == PIVOT)
+        self.owner = np.zeros(self.codes.shape, np.int32)
+        for index, (i, j) in enumerate(self.pivots):
+            for di, dj in ORIENTATIONS:
+                if self.codes[i + di, j + dj] == ARM:
+                    self.owner[i + di, j + dj] = index + 1
+
+        self.floor = np.where(
+            np.isin(self.codes, (WALL, DOOR, PIVOT)), self.codes, EMPTY
+        )
+        self.floor[(self.codes == ARM) & (self.owner == 0)] = ARM
+        self.floor = self.floor.astype(np.int8)
+
+        self.positions = np.zeros((4, 2), int)
+        self.alive = np.zeros(4, bool)
+        self.ranks = np.zeros(4, int)
+        self.characters = {}
+        for i, j in np.argwhere(self.codes == CHARACTER):
+            index = self.versions[i, j]
+            self.positions[index] = i, j
+            self.alive[index] = True
+            self.ranks[index] = i * self.width + j
+            self.characters[str(index + 1)] = _Piece(self, index)
+
+        self.last_move = None
+        self.state_hash = self.obstacle_hash = 0
+        self._rehash((0, 0), self._digest(self.snapshot()))
+        if check_wall:
+            self._check_grid()
+
+    def copy(self):
+        """Independent grid in the same state, static planes are shared."""
+        grid = copy.copy(self)
+        for name in ("codes", "versions", "owner", "positions", "alive"):
+            setattr(grid, name, getattr(self, name).copy())
+        grid.characters = {
+            name: _Piece(grid, piece.index) for name, piece in self.characters.items()
+        }
+        grid.last_move = None
+        return grid
+
+    def _refresh(self, i, j):
+        """Show the latest of static item and characters standing on cell.
+        Rank follows reading order of the layout, as for object items.
+        """
+        code, version, rank = self.floor[i, j], 0, -1
+        if code != EMPTY:
+            rank = i * self.width + j
+        for index in np.flatnonzero(self.alive):
+            if tuple(self.positions[index]) == (i, j) and self.ranks[index] > rank:
+                code, version, rank = CHARACTER, index, self.ranks[index]
+        self.codes[i, j] = code
+        self.versions[i, j] = version
+
+    def _relocate(self, index, coords, alive=True):
+        """Move character to coords and refresh both cells."""
+        old = tuple(self.positions[index])
+        self.positions[index] = coords
+        self.alive[index] = alive
+        self._refresh(*old)
+        if alive:
+            self._refresh(*coords)
+
+    def snapshot(self, cells=None):
+        """Record planes and character tables, for given cells only if any.
+        The record is a tuple of bytes.
+        """
+        if cells is None:
+            return self._record(slice(None))
+        return self._record(
+            np.ravel_multi_index(tuple(np.transpose(cells)), self.codes.shape)
+        )
+
+    def _record(self, select):
+        """Snapshot of flat cell indices select, or of everything for a slice."""
+        index = b"" if isinstance(select, slice) else select.astype(np.int32).tobytes()
+        planes = [
+            plane.ravel()[select].tobytes()
+            for plane in (self.codes, self.versions, self.owner)
+        ]
+        return (index, *planes, self.positions.tobytes(), self.alive.tobytes())
+
+    def _digest(self, record, characters=range(4)):
+        """XOR of the hash keys of given characters and of recorded cells,
+        return characters and obstacles digests.
+        Small records of single moves are hashed cell by cell, whole boards at once.
+        """
+        index, codes, versions, owner, positions, alive = record
+        if len(codes) <= 16:
+            digest = 0
+            cells = memoryview(index).cast("i") if index else range(len(codes))
+            # codes and versions are small positive numbers, bytes read as they are
+            for cell, code, version, pivot in zip(
+                cells, codes, versions, memoryview(owner).cast("i")
+            ):
+                if code == CRATE:
+                    digest ^= hashing.key(hashing.CRATE, cell)
+                elif code == HOLE:
+                    digest ^= hashing.key(hashing.HOLE + version, cell)
+                elif code == ARM and pivot:
+                    digest ^= hashing.key(hashing.ARM, cell)
+        else:
+            codes = np.frombuffer(codes, np.int8)
+            used = np.flatnonzero((codes == CRATE) | (codes == HOLE) | (codes == ARM))
+            codes = codes[used]
+            versions = np.frombuffer(versions, np.int8)[used]
+            owner = np.frombuffer(owner, np.int32)[used]
+            cells = np.frombuffer(index, np.int32)[used] if index else used
+            features = np.where(codes == HOLE, hashing.HOLE + versions, hashing.CRATE)
+            features[codes == ARM] = hashing.ARM
+            attached = (codes != ARM) | (owner > 0)
+            digest = hashing.combine(features[attached], cells[attached])
+
+        moving = 0
+        positions = memoryview(positions).cast(self.positions.dtype.char)
+        for character in characters:
+            if alive[character]:
+                i, j = positions[2 * character], positions[2 * character + 1]
+                moving ^= hashing.key(character, i * self.width + j)
+        return moving, digest
+
+    def restore(self, record):
+        """Bring planes and characters back to a recorded state."""
+        index, *planes, positions, alive = record
+        planes = [
+            np.frombuffer(data, plane.dtype)
+            for plane, data in zip((self.codes, self.versions, self.owner), planes)
+        ]
+        if index:
+            select = np.frombuffer(index, np.int32)
+        else:
+            # only cells that differ need hashing and writing
+            changed = (self.codes.ravel() != planes[0]) | (
+                self.versions.ravel() != planes[1]
+            )
+            changed |= self.owner.ravel() != planes[2]
+            select = np.flatnonzero(changed)
+            planes = [data[select] for data in planes]
+            record = (
+                select.astype(np.int32).tobytes(),
+                *(data.tobytes() for data in planes),
+                positions,
+                alive,
+            )
+
+        self._rehash(self._digest(self._record(select)), self._digest(record))
+        for plane, data in zip((self.codes, self.versions, self.owner), planes):
+            plane.ravel()[select] = data
+        self.positions[:] = np.frombuffer(positions, self.positions.dtype).reshape(4, 2)
+        self.alive[:] = np.frombuffer(alive, bool)
+
+    def observe(self, coords):
+        """Allow external to observe cell skin."""
+        i, j = coords
+        return SKIN_TABLE[self.codes[i, j], self.versions[i, j]]
+
+    def walkable(self, coords):
+        """Whether a character may step on coords without pushing, turning or winning,
+        characters standing there aside."""
+        code = self.codes[coords]
+        if code == CHARACTER:
+            code = self.floor[coords]
+        return code == EMPTY or code == ARM and not self.owner[coords]
+
+    def move(self, character_id, direction):
+        """Handle movement of given character and direction.
+        return whether any character won.
+        """
+        index = int(character_id) - 1
+        self.last_move = None
+        if not self.alive[index]:
+            return 0
+
+        di, dj = direction
+        i, j = self.positions[index]
+        target = i + di, j + dj
+        code = self.codes[target]
+
+        touched = [(i, j), target]
+        if code == CRATE or code == ARM and self.owner[target]:
+            touched.append((i + 2 * di, j + 2 * dj))
+        if code == ARM and self.owner[target]:
+            pi, pj = self.pivots[self.owner[target] - 1]
+            touched += [
+                (pi + oi, pj + oj)
+                for oi, oj in ORIENTATIONS
+                if (pi + oi, pj + oj) != target
+            ]
+        before = self.snapshot(touched)
+        outcome = self._dispatch(index, code, target, direction)
+        self.last_move = before, self.snapshot(touched)
+        # other characters stay put
+        self._rehash(
+            self._digest(before, (index,)), self._digest(self.last_move[1], (index,))
+        )
+        return outcome
+
+    def _dispatch(self, index, code, target, direction):
+        """Apply the move of character index into target cell of given code."""
+        if code == EMPTY or code == ARM and not self.owner[target]:
+            self._relocate(index, target)
+        elif code == DOOR:
+            self._relocate(index, target)
+            return 1
+        elif code == HOLE:
+            self._relocate(index, target, alive=False)
+        elif code == CRATE:
+            self._push(index, target, direction)
+        elif code == ARM:
+            self._turn(index, self.owner[target] - 1, direction)
+        return 0
+
+    def _push(self, index, target, direction):
+        """Move the crate or push it in a hole."""
+        beyond = target[0] + direction[0], target[1] + direction[1]
+        code = self.codes[beyond]
+
+        if code == HOLE:
+            depth = self.versions[beyond]
+            fall = depth > 0
+            if fall:
+                depth -= 1
+            self.versions[beyond] = depth
+            if depth <= 0:
+                self.codes[beyond] = self.versions[beyond] = EMPTY
+            if not fall:
+                return
+        elif code == EMPTY:
+            self.codes[beyond] = CRATE
+        else:
+            return
+
+        self.codes[target] = EMPTY
+        self._relocate(index, target)
+
+    def _turn(self, index, pivot, direction):
+        """Turn the turnstile around pivot if enough room is available."""
+        i, j = self.positions[index]
+        pi, pj = self.pivots[pivot]
+        di, dj = direction
+        moment = np.sign((i - pi) * dj - (j - pj) * di)
+        if not moment:
+            return
+
+        def rotate(orientation):
+            return -moment * orientation[1], moment * orientation[0]
+
+        arms = []
+        for oi, oj in ORIENTATIONS:
+            if self.owner[pi + oi, pj + oj] == pivot + 1:
+                arms.append((oi, oj))
+
+        for orientation in arms:
+            ci, cj = pi + orientation[0], pj + orientation[1]
+            for _ in range(2):
+                orientation = rotate(orientation)
+                ci, cj = ci + orientation[0], cj + orientation[1]
+                free = self.codes[ci, cj] == EMPTY or self.owner[ci, cj] == pivot + 1
+                if not ((ci, cj) == (i, j) or free):
+                    return
+
+        for oi, oj in arms:
+            self.codes[pi + oi, pj + oj] = EMPTY
+            self.owner[pi + oi, pj + oj] = 0
+        for orientation in arms:
+            oi, oj = rotate(orientation)
+            self.codes[pi + oi, pj + oj] = ARM
+            self.owner[pi + oi, pj + oj] = pivot + 1
+        self._relocate(index, (i + 2 * di, j + 2 * dj))
+
+    def render(self, window=None):
+        top, left, height, width = window or (0, 0, self.height, self.width)
+        cells = slice(top, top + height), slice(left, left + width)
+        skins = np.full((height, width + 1), "\n")
+        skins[:, :-1] = SKIN_TABLE[self.codes[cells], self.versions[cells]]
+        return "".join(skins.flat)[:-1]
+
+    def __str__(self):
+        return self.render()
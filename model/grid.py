@@ -1,32 +1,56 @@
 """Grid to hold and manage grid items"""
 
+from functools import cached_property
+
 import numpy as np
-from .grid_item import ItemFactory
 from . import item_types as types
+from . import analysis
+from . import hashing
+from . import layout
+from .grid_item import Coords
+
+
+# blank and wall cells share one instance each, their coords are meaningless
+EMPTY = types.Empty((0, 0))
+WALL = types.Wall((0, 0))
 
 
 class Grid:
-    """Hold all grid content and handle movements."""
+    """Hold all grid content and handle movements.
+    Storage engine is picked by backend name, object items by default.
+    """
 
-    def __init__(self, layout_path, check_wall=True):
-        """Read file and store content, then update own cells."""
-        self.items = []
-        self.characters = {}
+    backends = {}
+
+    def __new__(cls, *args, backend="object", **kwargs):
+        if cls is Grid:
+            try:
+                cls = cls.backends[backend]
+            except KeyError:
+                raise ValueError(f"Unregistered backend: {backend}")
+        return super().__new__(cls)
+
+    @classmethod
+    def register(cls, key):
+        """Make decorated Grid subclass available by backend name."""
+
+        def deco(backend):
+            cls.backends[key] = backend
+            return backend
 
-        try:
-            layout_file = open(layout_path)
-            cells = np.array([list(line)[:-1] for line in layout_file])
-            for (i, j), cell in np.ndenumerate(cells):
-                self.items.append(ItemFactory(cell)((i, j)))
-            layout_file.close()
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Invalid grid name : {layout_path}")
+        return deco
 
-        # todo: self.shape ?
-        self.height = max(i for i, _ in [item.coords for item in self.items]) + 1
-        self.width = max(j for _, j in [item.coords for item in self.items]) + 1
+    def __init__(self, layout_path, check_wall=True, backend="object"):
+        """Read file or pack:level identifier and store content,
+        then update own cells.
+        Only cells holding neither blank nor wall get an item."""
+        self.blueprint, versions = layout.decode(layout.load(layout_path))
+        self.height, self.width = self.blueprint.shape
 
-        self.items = [item for item in self.items if not isinstance(item, types.Empty)]
+        self.items = []
+        for i, j in np.argwhere(self.blueprint > layout.WALL).tolist():
+            item_type = layout.TYPES[self.blueprint[i, j]]
+            self.items.append(item_type((i, j), int(versions[i, j])))
 
         # handle specific types :
         def instances(cls, info):
@@ -41,61 +65,201 @@ class Grid:
             pivot.connect(arms)
 
         # self._connect_turnstiles(pivots, arms)
+        self._rank = {item: rank for rank, item in enumerate(self.items)}
+        mobile = (types.Character, types.Crate, types.Hole)
+        self._mobile = [
+            x for x in self.items if isinstance(x, mobile) or hasattr(x, "pivot")
+        ]
+        self.last_move = None
         self._update()
+        # hash feature of each item is base + version : characters by id, holes by depth
+        self._features = []
+        for item in self.items:
+            if isinstance(item, types.Character):
+                self._features.append(0)
+            elif isinstance(item, types.Crate):
+                self._features.append(hashing.CRATE)
+            elif isinstance(item, types.Hole):
+                self._features.append(hashing.HOLE)
+            elif hasattr(item, "pivot"):
+                self._features.append(hashing.ARM)
+            else:
+                self._features.append(None)
+        # obstacle_hash only follows crates, holes and arms
+        self.state_hash = self.obstacle_hash = 0
+        self._rehash((0, 0), self._digest(self.snapshot()))
         if check_wall:
             self._check_grid()
 
+    @cached_property
+    def dead_squares(self):
+        """Boolean plane of cells a crate can never get to a hole from,
+        computed from the layout on first use."""
+        return analysis.dead_squares(self.blueprint)
+
     def _check_grid(self):
         """Forbid small or open map."""
-
-        if max(self.width, self.height) < 5:
-            raise Exception("Grid is too small")
-
-        def walled(i, j, cell):
-            is_border = i in [0, self.height - 1] or j in [0, self.width - 1]
-            return not is_border or isinstance(cell, types.Wall)
-
-        if not all(walled(i, j, cell) for (i, j), cell in np.ndenumerate(self.cells)):
-            raise Exception("Build the wall")
+        layout.check(self.blueprint)
 
     def _update(self):
-        """Place items and fill up blanks."""
-        self.cells = np.empty((self.height, self.width), types.Empty)
+        """Place all items and fill up blanks.
+        Items sharing a cell are stacked, the last active one is shown.
+        """
+        self.cells = np.full((self.height, self.width), EMPTY, dtype=object)
+        self.cells[self.blueprint == layout.WALL] = WALL
+        self._occupants = {}
         for item in self.items:
+            self._occupants.setdefault(tuple(item.coords), []).append(item)
             if item.is_active:
                 self.cells[tuple(item.coords)] = item
 
-        for (i, j), cell in np.ndenumerate(self.cells):
-            if cell is None:
-                self.cells[i, j] = types.Empty((i, j))
+    def _touched(self, character, target, direction):
+        """Items that character moving into target may change."""
+        touched = [character, target]
+        if isinstance(target, types.Crate):
+            touched.append(self.observe(target.coords + direction))
+        elif hasattr(target, "pivot"):
+            touched += target.pivot.arms
+        return list(dict.fromkeys(item for item in touched if item in self._rank))
+
+    def _patch(self, record):
+        """Refresh only the cells that recorded items left or entered."""
+        dirty = set()
+        for rank, i, j, was_active, _ in self._unpack(record):
+            item, coords = self.items[rank], (i, j)
+            new_coords = tuple(item.coords)
+            if new_coords != coords:
+                self._occupants[coords].remove(item)
+                stack = self._occupants.setdefault(new_coords, [])
+                stack.append(item)
+                stack.sort(key=self._rank.get)
+            elif was_active == item.is_active:
+                continue
+            dirty.update((coords, new_coords))
+
+        for coords in dirty:
+            stack = self._occupants.get(coords, [])
+            active = [item for item in stack if item.is_active]
+            self.cells[coords] = active[-1] if active else EMPTY
+
+    def snapshot(self, items=None):
+        """Record mutable state of items, all that may change by default.
+        Rank, coords, is_active and version of each item are packed into bytes.
+        """
+        items = self._mobile if items is None else items
+        state = [
+            (self._rank[item], *item.coords, item.is_active, item.version)
+            for item in items
+        ]
+        return np.array(state, np.int32).reshape(-1, 5).tobytes()
+
+    @staticmethod
+    def _unpack(record):
+        return np.frombuffer(record, np.int32).reshape(-1, 5).tolist()
+
+    def _digest(self, record):
+        """XOR of the hash keys of recorded items, static items have none.
+        return characters and obstacles (crates, holes and arms) digests."""
+        digests = [0, 0]
+        for rank, i, j, active, version in self._unpack(record):
+            base = self._features[rank]
+            if active and base is not None:
+                digests[base >= hashing.CRATE] ^= hashing.key(
+                    base + version, i * self.width + j
+                )
+        return digests
+
+    def _rehash(self, old, new):
+        """Swap digests of a recorded state for those of its replacement."""
+        self.state_hash ^= old[0] ^ old[1] ^ new[0] ^ new[1]
+        self.obstacle_hash ^= old[1] ^ new[1]
+
+    def restore(self, record):
+        """Bring items back to a recorded state, patching only what changed."""
+        state = self._unpack(record)
+        current = self.snapshot([self.items[rank] for rank, *_ in state])
+        for rank, i, j, active, version in state:
+            item = self.items[rank]
+            item.coords = Coords(i, j)
+            item.is_active = bool(active)
+            item.version = version
+            if hasattr(item, "pivot"):
+                item.orientation = types.ORIENTATIONS.index(
+                    tuple(item.coords - item.pivot.coords)
+                )
+        self._patch(current)
+        self._rehash(self._digest(current), self._digest(record))
 
     def observe(self, coords):
         """Allow external to observe cell content."""
         return self.cells[tuple(coords)]
 
+    def walkable(self, coords):
+        """Whether a character may step on coords without pushing, turning or winning,
+        characters standing there aside."""
+        below = [
+            item for item in self._occupants.get(tuple(coords), []) if item.is_active
+        ]
+        below = [item for item in below if not isinstance(item, types.Character)]
+        cell = below[-1] if below else self.observe(coords)
+        return (
+            isinstance(cell, (types.Empty, types.Character))
+            or isinstance(cell, types.Arm)
+            and not hasattr(cell, "pivot")
+        )
+
     def move(self, character_id, direction):
         """Handle movement of given character and direction.
         return whether any character won.
         """
         character = self.characters[character_id]
-        direction = np.array(direction)
+        self.last_move = None
         if not character.is_active:
             return 0
 
-        direction = np.array(direction)
+        direction = Coords(*direction)
         position = character.coords
         target_cell = self.cells[tuple(position + direction)]
+        touched = self._touched(character, target_cell, direction)
+        before = self.snapshot(touched)
 
         outcome = target_cell.request_move(position, direction, self.observe)
         if outcome == -1:
             character.is_active = False
             outcome = 0
 
-        self._update()
+        self.last_move = before, self.snapshot(touched)
+        self._patch(before)
+        self._rehash(self._digest(before), self._digest(self.last_move[1]))
         return outcome
 
+    def window(self, coords, shape, origin=(0, 0)):
+        """(top, left, height, width) rectangle of at most shape cells showing coords.
+        The rectangle starting at origin is kept while coords is in it,
+        otherwise it is centered on coords, within the board."""
+        window = []
+        for position, start, size, length in zip(
+            coords, origin, shape, (self.height, self.width)
+        ):
+            size = min(size, length)
+            if not start <= position < start + size:
+                start = position - size // 2
+            window.append((int(max(0, min(start, length - size))), size))
+        (top, height), (left, width) = window
+        return top, left, height, width
+
+    def render(self, window=None):
+        """Text of the cells within window (top, left, height, width),
+        of the whole board by default."""
+        top, left, height, width = window or (0, 0, self.height, self.width)
+        rows = self.cells[top : top + height, left : left + width]
+        return "\n".join(["".join([str(cell) for cell in row]) for row in rows])
+
     def __str__(self):
-        return "\n".join(["".join([str(cell) for cell in row]) for row in self.cells])
+        return self.render()
+
+
+Grid.backends["object"] = Grid
 
 
 if __name__ == "__main__":
@@ -1,6 +1,55 @@
 """simplify grid item type and grid item instanciation"""
 
-import numpy as np
+
+class Coords:
+    """Mutable pair of integers, in place addition moves the owner.
+    Cheaper than a 2 element numpy array for scalar arithmetic.
+    >>> position = Coords(1, 2)
+    >>> position += (0, 1)
+    >>> position, position + Coords(1, 0) == (2, 3), 2 * position
+    (Coords(1, 3), True, Coords(2, 6))
+    """
+
+    __slots__ = ("i", "j")
+
+    def __init__(self, i, j):
+        self.i = i
+        self.j = j
+
+    def __iter__(self):
+        yield self.i
+        yield self.j
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, axis):
+        return (self.i, self.j)[axis]
+
+    def __add__(self, other):
+        di, dj = other
+        return Coords(self.i + di, self.j + dj)
+
+    def __iadd__(self, other):
+        di, dj = other
+        self.i += di
+        self.j += dj
+        return self
+
+    def __sub__(self, other):
+        di, dj = other
+        return Coords(self.i - di, self.j - dj)
+
+    def __rmul__(self, factor):
+        return Coords(factor * self.i, factor * self.j)
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Coords({self.i}, {self.j})"
 
 
 class _ItemBase:
@@ -15,7 +64,7 @@ class _ItemBase:
                 raise ValueError("coords should be 2D")
         except TypeError:
             raise TypeError("coords should be iterable")
-        coords = np.array(coords)
+        coords = Coords(*map(int, coords))
         if not isinstance(version, int):
             raise TypeError(f"version should be int, not {type(version)}")
 
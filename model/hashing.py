@@ -0,0 +1,33 @@
+"""Zobrist keys of grid features, shared by every backend so equal states hash equal.
+A state hash is the XOR of the keys of its (feature, cell) pairs,
+a move XORs out the pairs it removes and XORs in the ones it adds.
+Keys are computed on demand from a splitmix64 mix instead of stored in tables.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+
+# features 0 to 3 are characters by index, holes take one feature per depth
+CRATE, HOLE, ARM = 4, 5, 8
+MASK = (1 << 64) - 1
+
+
+@lru_cache(maxsize=1 << 16)
+def key(feature, cell):
+    """Key of feature on flat cell index."""
+    z = ((feature << 40 | cell) + 0x9E3779B97F4A7C15) & MASK
+    z = (z ^ z >> 30) * 0xBF58476D1CE4E5B9 & MASK
+    z = (z ^ z >> 27) * 0x94D049BB133111EB & MASK
+    return z ^ z >> 31
+
+
+def combine(features, cells):
+    """XOR of the keys of each feature on each cell, arrays of the same length."""
+    z = np.asarray(features, np.uint64) << np.uint64(40) | np.asarray(cells, np.uint64)
+    with np.errstate(over="ignore"):
+        z = z + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ z >> np.uint64(30)) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ z >> np.uint64(27)) * np.uint64(0x94D049BB133111EB)
+    return int(np.bitwise_xor.reduce(z ^ z >> np.uint64(31), initial=np.uint64(0)))
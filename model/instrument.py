@@ -0,0 +1,158 @@
+"""Opt-in timing of hot methods, nothing is wrapped unless a profile is installed.
+
+>>> from model import Grid
+>>> with Profile() as profile:
+...     grid = Grid("model/grid.txt")
+...     _ = grid.move("1", (1, 0))
+>>> profile.stats["Grid.move"].count
+1
+
+Methods are wrapped on their class, install before building grids
+so that turnstile arms pick up the wrapped Pivot.move_arm.
+"""
+
+import json
+import time
+from functools import wraps
+
+from . import item_types as types
+from . import layout
+from .grid import Grid
+
+
+def targets():
+    """(class, method name) pairs of the model timed by default."""
+    pairs = [(Grid, "_update"), (Grid, "_patch")]
+    pairs += [
+        (backend, name)
+        for backend in Grid.backends.values()
+        for name in ("move", "restore")
+    ]
+    pairs += [(item_type, "request_move") for item_type in layout.TYPES]
+    pairs += [(types.Pivot, "move_arm"), (types.Arm, "can_turn")]
+    return pairs
+
+
+class Stat:
+    """Call count, total and extreme durations and a histogram of durations,
+    bucket k counting calls of 2**(k-1) to 2**k nanoseconds."""
+
+    __slots__ = ("count", "total", "low", "high", "buckets")
+
+    def __init__(self):
+        self.count = self.total = self.high = 0
+        self.low = None
+        self.buckets = {}
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        self.low = duration if self.low is None else min(self.low, duration)
+        self.high = max(self.high, duration)
+        bucket = duration.bit_length()
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding given fraction of calls, nanoseconds,
+        at most the longest call."""
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= fraction * self.count:
+                return min(1 << bucket, self.high)
+        return 0
+
+
+class Profile:
+    """Wrap target methods with timers while installed.
+    With trace, every call is also kept as a Chrome trace event.
+    """
+
+    def __init__(self, trace=False):
+        self.trace = trace
+        self.stats = {}
+        self.events = []
+        self._originals = []
+        self._origin = time.perf_counter_ns()
+
+    def _wrap(self, name, method):
+        stat = self.stats.setdefault(name, Stat())
+        events = self.events if self.trace else None
+        clock = time.perf_counter_ns
+
+        @wraps(method)
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                duration = clock() - start
+                stat.add(duration)
+                if events is not None:
+                    events.append((name, start, duration))
+
+        return timed
+
+    def install(self, pairs=None):
+        """Wrap each (class, method name) of pairs, model targets by default."""
+        for owner, name in targets() if pairs is None else pairs:
+            original = owner.__dict__.get(name)
+            if original is None:
+                # inherited, timed on the class defining it
+                continue
+            label = f"{owner.__name__}.{name}"
+            if isinstance(original, staticmethod):
+                wrapped = staticmethod(self._wrap(label, original.__func__))
+            else:
+                wrapped = self._wrap(label, original)
+            self._originals.append((owner, name, original))
+            setattr(owner, name, wrapped)
+        return self
+
+    def uninstall(self):
+        """Put original methods back, latest first."""
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def table(self):
+        """Summary of timed methods, slowest in total first."""
+        lines = [
+            f"{'method':28} {'calls':>9} {'total ms':>10} {'mean us':>9}"
+            f" {'p50 us':>8} {'p99 us':>8} {'max us':>9}"
+        ]
+        for name, stat in sorted(self.stats.items(), key=lambda item: -item[1].total):
+            if not stat.count:
+                continue
+            mean = stat.total / stat.count
+            lines.append(
+                f"{name:28} {stat.count:9} {stat.total / 1e6:10.2f} {mean / 1e3:9.2f}"
+                f" {stat.quantile(0.5) / 1e3:8.1f} {stat.quantile(0.99) / 1e3:8.1f}"
+                f" {stat.high / 1e3:9.1f}"
+            )
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Recorded calls as a Chrome trace document (chrome://tracing, Perfetto)."""
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self._origin) / 1e3,
+                "dur": duration / 1e3,
+                "pid": 0,
+                "tid": 0,
+            }
+            for name, start, duration in self.events
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ns"}
+
+    def dump(self, path):
+        with open(path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
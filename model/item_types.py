@@ -1,9 +1,28 @@
 """GridItem instances needed for the game."""
 
-import numpy as np
 from .grid_item import GridItem
 
 
+# arm orientations in clockwise order, turning moves an arm one step along
+ORIENTATIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+def _sweeps():
+    """(orientation, moment) -> cells swept relative to pivot, new orientation.
+    An arm first goes through the corner, then lands next to the pivot.
+    """
+    sweeps = {}
+    for index, (oi, oj) in enumerate(ORIENTATIONS):
+        for moment in (1, -1):
+            new = (index - moment) % 4
+            ni, nj = ORIENTATIONS[new]
+            sweeps[index, moment] = ((oi + ni, oj + nj), (ni, nj)), new
+    return sweeps
+
+
+SWEEPS = _sweeps()
+
+
 Empty = GridItem("Empty", (), " ")
 Wall = GridItem("Wall", (), "#", block=True)
 Door = GridItem("Door", (), "@", win=True)
@@ -66,25 +85,25 @@ class Arm(metaclass=GridItem):
 
     skin = "/"
 
-    def can_turn(self, rotation, position, observe):
+    def can_turn(self, moment, position, observe):
         """Can the arm go through the next two cells
-        given the rotation matrix and moving character position
+        given the turn direction and moving character position
         """
-        # orientation and coords of obstacle
-        orientation = np.copy(self.orientation)
-        coords = np.copy(self.coords)
-        for _ in range(2):
-            orientation = np.dot(rotation, orientation)
-            coords += orientation
+        for offset in SWEEPS[self.orientation, moment][0]:
+            coords = self.pivot.coords + offset
             obstacle = observe(coords)
-            if not ((coords == position).all() or isinstance(obstacle, (Empty, Arm))):
+            if not (
+                coords == position
+                or isinstance(obstacle, Empty)
+                or obstacle in self.pivot.arms
+            ):
                 return False
         return True
 
-    def turn(self, rotation, pivot):
-        """Rotate around pivot given the rotation matrix."""
-        self.orientation = np.dot(rotation, self.orientation)
-        self.coords = pivot + self.orientation
+    def turn(self, moment):
+        """Rotate around pivot given the turn direction."""
+        self.orientation = SWEEPS[self.orientation, moment][1]
+        self.coords = self.pivot.coords + ORIENTATIONS[self.orientation]
 
 
 class Pivot(metaclass=GridItem, block=True):
@@ -97,20 +116,28 @@ class Pivot(metaclass=GridItem, block=True):
         Give them the ability to turn around self.
         """
         self.arms = []
-        for orientation in map(np.array, [[0, 1], [0, -1], [-1, 0], [1, 0]]):
-            arm_coords = tuple(np.array(self.coords) + orientation)
+        for orientation in [(0, 1), (0, -1), (-1, 0), (1, 0)]:
+            arm_coords = tuple(self.coords + orientation)
             if arm_coords in all_arms:
                 arm = all_arms[arm_coords]
-                arm.orientation = orientation
+                if hasattr(arm, "pivot"):
+                    # an arm between two pivots only turns with the last one
+                    arm.pivot.arms.remove(arm)
+                arm.orientation = ORIENTATIONS.index(orientation)
+                arm.pivot = self
                 arm.request_move = self.move_arm
                 self.arms.append(arm)
 
     def move_arm(self, position, direction, observe):
         """Turn around if enough room is available"""
-        moment = np.sign(np.cross(position - self.coords, direction))
-        rotation = moment * np.array([[0, -1], [1, 0]])
-        if all(arm.can_turn(rotation, position, observe) for arm in self.arms):
+        di, dj = direction
+        cross = (position.i - self.coords.i) * dj - (position.j - self.coords.j) * di
+        if not cross:
+            # pushing an arm straight at its pivot
+            return 0
+        moment = 1 if cross > 0 else -1
+        if all(arm.can_turn(moment, position, observe) for arm in self.arms):
             for arm in self.arms:
-                arm.turn(rotation, self.coords)
+                arm.turn(moment)
             position += 2 * direction
         return 0
@@ -0,0 +1,105 @@
+"""Locate, read and decode level layouts, from plain files or level packs.
+A layout is decoded with one table lookup over its character buffer
+into a plane of type codes and a plane of versions.
+"""
+
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+from . import item_types as types
+from .pack import Pack
+
+
+TYPES = (
+    types.Empty,
+    types.Wall,
+    types.Door,
+    types.Character,
+    types.Hole,
+    types.Crate,
+    types.Arm,
+    types.Pivot,
+)
+EMPTY, WALL, DOOR, CHARACTER, HOLE, CRATE, ARM, PIVOT = range(len(TYPES))
+
+
+def _skins():
+    """Map each skin to its (code, version) and back."""
+    codes = {}
+    table = np.full((len(TYPES), 4), "?")
+    for code, item_type in enumerate(TYPES):
+        skins = item_type.skin if isinstance(item_type.skin, list) else [item_type.skin]
+        for version, skin in enumerate(skins):
+            codes[skin] = (code, version)
+            table[code, version] = skin
+    return codes, table
+
+
+SKIN_CODES, SKIN_TABLE = _skins()
+
+# byte value -> code and version, -1 marks unknown skins
+CODE_TABLE = np.full(256, -1, np.int8)
+VERSION_TABLE = np.zeros(256, np.int8)
+for _skin, (_code, _version) in SKIN_CODES.items():
+    CODE_TABLE[ord(_skin)] = _code
+    VERSION_TABLE[ord(_skin)] = _version
+
+
+@lru_cache(maxsize=16)
+def open_pack(path):
+    """Keep recently used packs mapped."""
+    return Pack(path)
+
+
+def read(source):
+    """Return layout text of source : a file path, a pack:level identifier
+    or the layout text itself, told apart by its line breaks."""
+    if "\n" in source:
+        return source
+    path, _, name = source.rpartition(":")
+    if not os.path.exists(source) and os.path.isfile(path):
+        return open_pack(path).level(name)
+
+    try:
+        with open(source) as layout_file:
+            return layout_file.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Invalid grid name : {source}")
+
+
+def digest(source):
+    """Fingerprint of layout text of source, 16 bytes."""
+    return hashlib.blake2b(read(source).encode(), digest_size=16).digest()
+
+
+def load(source):
+    """Return layout characters of source as a 2D array of bytes."""
+    text = read(source)
+    if not text.endswith("\n"):
+        text += "\n"
+    buffer = np.frombuffer(text.encode(), np.uint8)
+    width = text.index("\n") + 1
+    if len(buffer) % width or (buffer[width - 1 :: width] != ord("\n")).any():
+        raise ValueError(f"Layout rows should have the same length : {source}")
+    return buffer.reshape(-1, width)[:, :-1]
+
+
+def decode(characters):
+    """Return type code and version planes of layout characters."""
+    codes = CODE_TABLE[characters]
+    if (codes < 0).any():
+        unknown = characters[codes < 0][0]
+        raise KeyError(f"Unknown skin : {chr(unknown)}")
+    return codes, VERSION_TABLE[characters]
+
+
+def check(codes):
+    """Forbid small or open map."""
+    if max(codes.shape) < 5:
+        raise Exception("Grid is too small")
+
+    borders = [codes[0], codes[-1], codes[:, 0], codes[:, -1]]
+    if not all((border == WALL).all() for border in borders):
+        raise Exception("Build the wall")
@@ -0,0 +1,119 @@
+"""Level packs : many named layouts with metadata in one memory-mapped file.
+
+File layout :
+    header  : magic, format version, level count, index offset
+    bodies  : layout texts and JSON metadata, back to back
+    index   : one fixed-size record per level, sorted by name
+Opening reads the header only, a level is looked up by bisection over the index
+and decoded when asked for.
+"""
+
+import json
+import mmap
+import struct
+
+
+MAGIC = b"KWPK"
+VERSION = 1
+NAME_SIZE = 64
+HEADER = struct.Struct("<4sHIQ")
+# name, layout offset and length, metadata offset and length
+RECORD = struct.Struct(f"<{NAME_SIZE}sQIQI")
+
+
+class Pack:
+    """Read-only access to a level pack."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as pack_file:
+            self._map = mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self._index = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} level pack")
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, position):
+        name, *spans = RECORD.unpack_from(
+            self._map, self._index + position * RECORD.size
+        )
+        return (name.rstrip(b"\0").decode(), *spans)
+
+    def _find(self, name):
+        """Index record of named level, by bisection over sorted records."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            record = self._record(middle)
+            if record[0] == name:
+                return record
+            if record[0] < name:
+                low = middle + 1
+            else:
+                high = middle
+        raise KeyError(f"No level {name} in {self.path}")
+
+    def names(self):
+        """Iterate over level names, in order."""
+        for position in range(self._count):
+            yield self._record(position)[0]
+
+    def level(self, name):
+        """Return layout text of named level."""
+        _, offset, length, _, _ = self._find(name)
+        return self._map[offset : offset + length].decode()
+
+    def meta(self, name):
+        """Return metadata of named level."""
+        _, _, _, offset, length = self._find(name)
+        return json.loads(self._map[offset : offset + length])
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PackWriter:
+    """Stream levels into a new pack, the index is written on close."""
+
+    def __init__(self, path):
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self._records = {}
+
+    def add(self, name, layout, meta=None):
+        """Append a level, layout is its text."""
+        encoded = name.encode()
+        if len(encoded) > NAME_SIZE or ":" in name:
+            raise ValueError(f"Invalid level name : {name}")
+        if name in self._records:
+            raise ValueError(f"{name} is already in pack")
+        if not layout.endswith("\n"):
+            layout += "\n"
+
+        spans = []
+        for body in (layout.encode(), json.dumps(meta or {}).encode()):
+            spans += [self._file.tell(), len(body)]
+            self._file.write(body)
+        self._records[name] = RECORD.pack(encoded, *spans)
+
+    def close(self):
+        index = self._file.tell()
+        for name in sorted(self._records):
+            self._file.write(self._records[name])
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(self._records), index))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
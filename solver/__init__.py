@@ -0,0 +1,4 @@
+"""Find out whether a level can be won and how."""
+
+from .search import Search, SearchLimit, solve
+from .parallel import ParallelSearch, solve_parallel
@@ -0,0 +1,98 @@
+"""Breadth first search with node expansion spread over a process pool."""
+
+import multiprocessing
+
+from model import Grid
+from .search import Search
+
+
+# per worker search, set up by the pool initializer
+_worker = None
+
+
+def _setup(layout_path, backend, active, prune):
+    global _worker
+    _worker = Search(Grid(layout_path, backend=backend), active, prune=prune)
+
+
+def _expand_chunk(chunk):
+    """Expand each (record, active) of chunk in the worker process.
+    return, per node, its (command, active, win, key, record) children,
+    dead ends where every character fell are left out.
+    """
+    search = _worker
+    expanded = []
+    for record, active in chunk:
+        children = []
+        for command, child_active, win in search.children(record, active):
+            if win:
+                children.append((command, child_active, win, None, None))
+                break
+            if search._alive():
+                key = search.key(child_active)
+                children.append(
+                    (command, child_active, win, key, search.grid.snapshot())
+                )
+        expanded.append(children)
+    return expanded
+
+
+class ParallelSearch(Search):
+    """Level synchronous breadth first search.
+    Each frontier is cut into chunks that idle workers pull from the pool,
+    the master process owns the visited table and merges children in frontier order,
+    so the command string found is the one the serial search finds.
+    Workers load their own grid from the layout, states travel as snapshots.
+    """
+
+    def __init__(
+        self, layout_path, backend="object", processes=None, chunk=64, **limits
+    ):
+        super().__init__(Grid(layout_path, backend=backend), **limits)
+        self.layout_path = layout_path
+        self.backend = backend
+        self.processes = processes
+        self.chunk = chunk
+
+    def bfs(self):
+        """Breadth first search, return shortest command string or None."""
+        start = self.key(self.active)
+        table = {}
+        self._visit(table, start, None)
+        frontier = [(self.grid.snapshot(), self.active, start)]
+
+        setup = (self.layout_path, self.backend, self.active, self.prune)
+        with multiprocessing.Pool(self.processes, _setup, setup) as pool:
+            while frontier:
+                chunks = [
+                    [
+                        (record, active)
+                        for record, active, _ in frontier[first : first + self.chunk]
+                    ]
+                    for first in range(0, len(frontier), self.chunk)
+                ]
+                keys = iter([key for _, _, key in frontier])
+                frontier = []
+                # imap hands chunks out as workers free up and yields results in order
+                for expanded in pool.imap(_expand_chunk, chunks):
+                    for children in expanded:
+                        key = next(keys)
+                        self._expand()
+                        for command, child_active, win, child_key, record in children:
+                            if win:
+                                return self._path(table, key, command)
+                            if self._visit(table, child_key, (key, command)):
+                                frontier.append((record, child_active, child_key))
+        return None
+
+    def run(self, method="bfs"):
+        """Search with given method, breadth first by default.
+        Only breadth first search is spread over workers, astar runs in this process."""
+        return super().run(method)
+
+
+def solve_parallel(layout_path, backend="object", processes=None, **limits):
+    """Return the shortest command string winning the layout, None if there is none.
+    Expansion runs on processes workers, all cores by default.
+    """
+    return ParallelSearch(layout_path, backend, processes, **limits).run("bfs")
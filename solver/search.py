@@ -0,0 +1,260 @@
+"""Search the shortest winning command string over grid states."""
+
+import heapq
+import itertools
+import sys
+from collections import deque
+
+from control.game import COMMANDS
+from model import analysis
+from model.cache import key as fingerprint
+from model.item_types import Crate
+
+
+class SearchLimit(Exception):
+    """Node or memory budget exhausted before the search could conclude."""
+
+
+class Search:
+    """Explore grid states reachable by game commands.
+    A state is the grid content and the active character,
+    every command (move or character switch) costs one step.
+    Nodes hold grid snapshots, the grid itself is restored to each of them in turn
+    and left in its initial state.
+    With prune, pushes leaving a crate on a dead square or frozen are skipped.
+    This gives up optimality and completeness : a level is won at the door, and
+    pushing a crate out of the way onto a dead square may be the only or shortest
+    way there. Pruned searches may then find a longer solution or none, prune only
+    suits levels where every crate is meant for a hole.
+    """
+
+    def __init__(self, grid, active="1", max_nodes=None, max_memory=None, prune=False):
+        self.grid = grid
+        self.prune = prune
+        self.active = active
+        self.max_nodes = max_nodes
+        self.max_memory = max_memory
+        self.nodes = 0
+        self.memory = 0
+
+        rows = str(grid).split("\n")
+        self.doors = [
+            (i, j)
+            for i, row in enumerate(rows)
+            for j, cell in enumerate(row)
+            if cell == "@"
+        ]
+        # a turnstile carries the character two cells in one move
+        self.stride = 2 if any("%" in row for row in rows) else 1
+
+    def key(self, active):
+        """Transposition table key of the current state."""
+        return self.grid.state_hash, active
+
+    def heuristic(self, active):
+        """Lower bound on the commands left : closest character to a door,
+        plus one switch if that character is not the active one."""
+        best = None
+        for name, character in self.grid.characters.items():
+            if not character.is_active:
+                continue
+            i, j = character.coords
+            for di, dj in self.doors:
+                steps = -(-(abs(i - di) + abs(j - dj)) // self.stride) + (
+                    name != active
+                )
+                best = steps if best is None else min(best, steps)
+        return best
+
+    def children(self, record, active):
+        """Yield (command, active, win) for each command from recorded state,
+        with the grid left in the resulting state."""
+        for command, direction in COMMANDS.items():
+            self.grid.restore(record)
+            pushed = self._pushed(active, direction) if self.prune else None
+            win = self.grid.move(active, direction)
+            if pushed is not None and not win and self._deadlocked(pushed):
+                continue
+            yield command, active, win
+
+        self.grid.restore(record)
+        for name, character in self.grid.characters.items():
+            if name != active and character.is_active:
+                yield name, name, 0
+
+    def _is_crate(self, cell):
+        return str(self.grid.observe(cell)) == Crate.skin
+
+    def _pushed(self, active, direction):
+        """Cell a crate lands on if active character pushes one, else None."""
+        (i, j), (di, dj) = self.grid.characters[active].coords, direction
+        if self._is_crate((i + di, j + dj)):
+            return i + 2 * di, j + 2 * dj
+        return None
+
+    def _deadlocked(self, cell):
+        """Whether crate just pushed to cell can no longer fill a hole."""
+        if not self._is_crate(cell):
+            # fell into a hole, or did not move
+            return False
+        if self.grid.dead_squares[cell]:
+            return True
+        rows = str(self.grid).split("\n")
+        crates = {
+            (i, j)
+            for i, row in enumerate(rows)
+            for j, skin in enumerate(row)
+            if skin == Crate.skin
+        }
+        return analysis.frozen(
+            crates, self.grid.blueprint, self.grid.dead_squares, cell
+        )
+
+    def _visit(self, table, key, parent):
+        """Record key in table, return False if already there."""
+        if key in table:
+            return False
+        table[key] = parent
+        self.memory += sys.getsizeof(key[0]) + 64
+        if self.max_memory is not None and self.memory > self.max_memory:
+            raise SearchLimit(f"memory budget exceeded after {self.nodes} nodes")
+        return True
+
+    def _expand(self):
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchLimit(f"node budget exceeded ({self.max_nodes})")
+
+    @staticmethod
+    def _path(table, key, command):
+        commands = [command]
+        while table[key] is not None:
+            key, command = table[key]
+            commands.append(command)
+        return "".join(reversed(commands))
+
+    def _alive(self):
+        return any(character.is_active for character in self.grid.characters.values())
+
+    def bfs(self):
+        """Breadth first search, return shortest command string or None."""
+        start = self.key(self.active)
+        table = {}
+        self._visit(table, start, None)
+        frontier = deque([(self.grid.snapshot(), self.active, start)])
+
+        while frontier:
+            record, active, key = frontier.popleft()
+            self._expand()
+            for command, child_active, win in self.children(record, active):
+                if win:
+                    return self._path(table, key, command)
+                child_key = self.key(child_active)
+                if self._alive() and self._visit(table, child_key, (key, command)):
+                    frontier.append((self.grid.snapshot(), child_active, child_key))
+        return None
+
+    def astar(self):
+        """A* search with the door distance heuristic,
+        return shortest command string or None."""
+        start = self.key(self.active)
+        table = {}
+        self._visit(table, start, None)
+        costs = {start: 0}
+        counter = itertools.count()
+        heuristic = self.heuristic(self.active)
+        if heuristic is None:
+            return None
+        frontier = [
+            (
+                heuristic,
+                next(counter),
+                0,
+                self.grid.snapshot(),
+                self.active,
+                start,
+                None,
+            )
+        ]
+
+        while frontier:
+            _, _, cost, record, active, key, win = heapq.heappop(frontier)
+            if win is not None:
+                return self._path(table, *win)
+            if cost > costs.get(key, cost):
+                continue
+            self._expand()
+            for command, child_active, win in self.children(record, active):
+                if win:
+                    heapq.heappush(
+                        frontier,
+                        (
+                            cost + 1,
+                            next(counter),
+                            cost + 1,
+                            None,
+                            None,
+                            None,
+                            (key, command),
+                        ),
+                    )
+                    continue
+                child_key = self.key(child_active)
+                heuristic = self.heuristic(child_active)
+                if heuristic is None or cost + 1 >= costs.get(child_key, cost + 2):
+                    continue
+                costs[child_key] = cost + 1
+                table.pop(child_key, None)
+                self._visit(table, child_key, (key, command))
+                entry = (
+                    cost + 1 + heuristic,
+                    next(counter),
+                    cost + 1,
+                    self.grid.snapshot(),
+                    child_active,
+                    child_key,
+                    None,
+                )
+                heapq.heappush(frontier, entry)
+        return None
+
+    def run(self, method="astar"):
+        """Search with given method, then put the grid back in its initial state."""
+        initial = self.grid.snapshot()
+        try:
+            return getattr(self, method)()
+        finally:
+            self.grid.restore(initial)
+
+
+def solve(grid, method="astar", cache=None, **limits):
+    """Return the shortest command string winning from grid, None if there is none.
+    Raise SearchLimit when max_nodes or max_memory (bytes) are exceeded.
+    With prune, the result may be longer than the shortest or None, see Search.
+    With a model.cache.Cache, known results are returned without searching
+    and new ones are stored, with the node count they took.
+    """
+    if cache is None:
+        return Search(grid, **limits).run(method)
+
+    key = fingerprint(grid, limits.get("active", "1"))
+    kind = "solve:prune" if limits.get("prune") else "solve"
+    entry = cache.get(key, kind)
+    budget = limits.get("max_nodes")
+    if entry is not None:
+        if entry["solved"]:
+            return entry["solution"]
+        if budget is not None and budget <= entry["nodes"]:
+            raise SearchLimit(f"node budget exceeded ({budget})")
+
+    search = Search(grid, **limits)
+    try:
+        solution = search.run(method)
+    except SearchLimit:
+        if entry is None or search.nodes > entry["nodes"]:
+            cache.put(
+                key, kind, {"solved": False, "solution": None, "nodes": search.nodes}
+            )
+        raise
+    cache.put(key, kind, {"solved": True, "solution": solution, "nodes": search.nodes})
+    return solution
@@ -1,7 +1,30 @@
+import asyncio
+import io
+import json
 import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import numpy as np
 from model import Grid
+from model import analysis
+from model import instrument
+from model.cache import Cache, key as fingerprint
+from model.chunked import CHUNK
+from model.compact import CompactGrid
 from control import Game
+from control.game import MAP_CELLS
+from control.replay import Recorder, Replay, ReplayMismatch, verify_directory
+from model.batch import Batch
+from solver import ParallelSearch, SearchLimit, solve, solve_parallel
+from view import App
+from tools.build_pack import build
+from tools import fuzz, generate, validate
+from bench import boards, suite
 
 
 def fixture_name(name):
@@ -9,9 +32,9 @@ def fixture_name(name):
     return os.getcwd() + "/fixtures/" + name + ".txt"
 
 
-def build_fixture(name):
+def build_fixture(name, backend="object"):
     """build game from fixture name"""
-    return Game(Grid(fixture_name(name)), None)
+    return Game(Grid(fixture_name(name), backend=backend), None)
 
 
 def extract_fixture(name):
@@ -60,5 +83,727 @@ class GlobalTest(unittest.TestCase):
         self.assertTrue(*expectation(move, "global"))
 
 
+class UpdateTest(unittest.TestCase):
+    def test_patch(self):
+        """patched cells match a full rebuild after each move"""
+        game = build_fixture("../model/grid")
+        for command in "1vv>>^^<2^>>3>>>v<<^":
+            game.process_input(command)
+            cells = game.grid.cells.copy()
+            game.grid._update()
+            self.assertTrue((cells == game.grid.cells).all(), command)
+
+
+class CompactTest(unittest.TestCase):
+    def test_equivalence(self):
+        """compact backend renders like object items after each command"""
+        move = "1vv2^>3>>>"
+        reference = build_fixture("../model/grid")
+        game = build_fixture("../model/grid", "compact")
+        for command in move:
+            reference.process_input(command)
+            game.process_input(command)
+            self.assertEqual(str(reference.grid), str(game.grid), command)
+        write_fixture(str(game.grid))
+        self.assertTrue(*expectation(move, "global"))
+
+
+class ChunkedTest(unittest.TestCase):
+    def test_equivalence(self):
+        """chunked backend plays like compact across tiles,
+        only changed tiles get arrays"""
+        with tempfile.TemporaryDirectory() as directory:
+            levels = {
+                fixture_name("../model/grid"): "1vv2^>3>>>u",
+                boards.write(CHUNK + 6, "turnstiles", directory): ">" * CHUNK + "uur",
+            }
+            for path, commands in levels.items():
+                reference = Game(Grid(path, backend="compact"), None)
+                game = Game(Grid(path, backend="chunked"), None)
+                record = game.grid.snapshot()
+                for command in commands:
+                    self.assertEqual(reference.run(command), game.run(command), command)
+                    self.assertEqual(str(reference.grid), str(game.grid), command)
+                self.assertLessEqual(len(game.grid.codes.tiles), 2)
+                game.grid.restore(record)
+                self.assertEqual(str(game.grid), str(Grid(path)))
+                self.assertEqual(game.grid.state_hash, Grid(path).state_hash)
+
+    def test_viewport(self):
+        """apps with a viewport get the cells around the active character"""
+
+        class Small:
+            viewport = (3, 5)
+
+            def __init__(self, *a):
+                self.frames = []
+
+            def update(self, grid, _):
+                self.frames.append(grid)
+
+            def launch(self):
+                pass
+
+        for backend in ["object", "compact", "chunked"]:
+            game = Game(Grid(fixture_name("../model/grid"), backend=backend), Small)
+            game.play()
+            self.assertEqual(game.app.frames[-1], "#####\n#1  #\n#   /")
+            game.callback("3")()
+            self.assertEqual(game.app.frames[-1], "## ##\n  3*O\n    #")
+            # clicks are relative to the cells shown
+            game.callback((1, 1))()
+            self.assertEqual(game.grid.characters["3"].coords, (4, 8))
+            self.assertEqual(game.app.frames[-1], "## ##\n 3 *O\n    #")
+            # the level has no character 4, its moves change nothing
+            game.callback("4")()
+            game.callback(">")()
+            self.assertEqual(game.app.frames[-2:], ["## ##\n 3 *O\n    #"] * 2)
+
+
+class UndoTest(unittest.TestCase):
+    def test_undo(self):
+        """undo brings back every state, redo replays the moves"""
+        for backend in ["object", "compact", "chunked"]:
+            game = build_fixture("../model/grid", backend)
+            states = [str(game.grid)]
+            for command in "1vv2^>3>>>":
+                game.process_input(command)
+                states.append(str(game.grid))
+            states = list(dict.fromkeys(states))
+            for state in reversed(states):
+                self.assertEqual(str(game.grid), state)
+                game.process_input("u")
+            game.process_input("r" * len(states))
+            self.assertEqual(str(game.grid), states[-1])
+
+
+class HashTest(unittest.TestCase):
+    def test_state_hash(self):
+        """backends agree on the hash, it follows moves and undo incrementally"""
+        reference = build_fixture("../model/grid")
+        game = build_fixture("../model/grid", "compact")
+        hashes, states = [game.grid.state_hash], [str(game.grid)]
+        for command in "1vv2^>3>>>":
+            reference.process_input(command)
+            game.process_input(command)
+            self.assertEqual(reference.grid.state_hash, game.grid.state_hash, command)
+            characters, obstacles = game.grid._digest(game.grid.snapshot())
+            self.assertEqual(game.grid.state_hash, characters ^ obstacles)
+            self.assertEqual(reference.grid.obstacle_hash, obstacles)
+            hashes.append(game.grid.state_hash)
+            states.append(str(game.grid))
+        # same hash exactly for same board
+        self.assertEqual(len(set(hashes)), len(set(states)))
+        self.assertEqual(len(set(hashes)), len(set(zip(hashes, states))))
+        game.process_input("u" * len(hashes))
+        self.assertEqual(game.grid.state_hash, hashes[0])
+
+
+class RunTest(unittest.TestCase):
+    def test_run(self):
+        """headless runs stop at the command ending the game"""
+        for backend in ["object", "compact"]:
+            game = Game(Grid(fixture_name("solvable"), backend=backend), None)
+            outcome = game.run("x2<1>>>>>>>>")
+            self.assertEqual(outcome[:3], ("win", 9, "1"))
+            self.assertEqual(outcome.state_hash, game.grid.state_hash)
+
+            game = Game(Grid(fixture_name("solvable"), backend=backend), None)
+            self.assertEqual(
+                game.run(">>>>2^<q>"), ("quit", 7, "2", game.grid.state_hash)
+            )
+            self.assertEqual(game.run("1u").status, None)
+
+        for backend in Grid.backends:
+            game = Game(Grid(fixture_name("solvable"), backend=backend), None)
+            initial = game.grid.state_hash
+            self.assertEqual(game.run("4>"), (None, 2, "4", initial))
+            self.assertIsNone(game.goto((1, 3)))
+            self.assertEqual(game.run("1>").state_hash, game.grid.state_hash)
+            self.assertNotEqual(game.grid.state_hash, initial)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "hole.txt")
+            with open(path, "w") as level:
+                level.write("#####\n#1o@#\n#2 ##\n#####\n#####\n")
+            game = Game(Grid(path), None)
+            self.assertEqual(game.run(">2^>")[:2], ("dead", 3))
+
+
+class InstrumentTest(unittest.TestCase):
+    def test_profile(self):
+        """installed timers count calls, originals come back on uninstall"""
+        original = Grid.move
+        with instrument.Profile(trace=True) as profile:
+            self.assertIsNot(Grid.move, original)
+            game = build_fixture("../model/grid")
+            game.process_input("1vv2^>3>>>")
+        self.assertIs(Grid.move, original)
+        self.assertEqual(profile.stats["Grid.move"].count, 7)
+        self.assertEqual(profile.stats["Arm.can_turn"].count, 5)
+        self.assertIn("Pivot.move_arm", profile.table())
+        events = profile.chrome_trace()["traceEvents"]
+        self.assertEqual(sum(event["name"] == "Grid.move" for event in events), 7)
+
+
+class GotoTest(unittest.TestCase):
+    def test_goto(self):
+        """shortest walks around crates and turnstiles, maps cached until one moves"""
+        for backend in ["object", "compact"]:
+            game = build_fixture("../model/grid", backend)
+            self.assertEqual(game.goto((2, 2)), ">v")
+            self.assertIsNone(game.goto((4, 1)))
+            game.process_input("3")
+            self.assertIsNone(game.path((1, 7)))
+            self.assertEqual(game.path((6, 14)), None)
+            self.assertEqual(len(game._maps), 4)
+
+            game.process_input("2")
+            self.assertEqual(game.goto((6, 1)), "vv<<")
+            self.assertEqual(game.goto((4, 3)), ">>^^")
+            self.assertEqual(game.goto((6, 1)), "vv<<")
+            self.assertEqual(len(game._maps), 6)
+            # the crate falling in the hole changes obstacles, stale maps are not used
+            game.process_input("3>")
+            self.assertEqual(game.path((4, 9)), "<")
+            self.assertEqual(len(game._maps), 7)
+
+        game = Game(Grid(fixture_name("solvable")), Over())
+        self.assertIsNone(game.path((2, 5)))
+        game.process_input(">>")
+        self.assertEqual(game.path((2, 5)), ">>")
+        # turnstiles are not turned on the way
+        self.assertIsNone(game.path((2, 8)))
+
+        game = Game(Grid("#####\n#1 @#\n#####\n"), Over())
+        self.assertEqual(game.goto((1, 3)), ">>")
+        self.assertTrue(game.app.over)
+
+    def test_large(self):
+        """searches on a large board only look around the walk,
+        maps are bounded in cells"""
+        rows = ["#" * 1000] + ["#" + " " * 998 + "#"] * 998 + ["#" * 1000]
+        rows[1] = "#1" + " " * 996 + "@#"
+        game = Game(Grid("\n".join(rows) + "\n", backend="compact"), Over())
+        self.assertEqual(game.goto((3, 3)), ">>vv")
+        self.assertLess(game._map_cells, 100)
+        self.assertEqual(game.goto((900, 3)), "v" * 897)
+        self.assertLess(game._map_cells, 10000)
+        self.assertEqual(len(game.path((1, 998))), 997 + 897)
+        self.assertLessEqual(game._map_cells, MAP_CELLS)
+
+
+class ReplayTest(unittest.TestCase):
+    def test_replay(self):
+        """replays verify, seek back to any step and catch a changed level"""
+        commands = "1vv2^>3>>>uu>1<r"
+        with tempfile.TemporaryDirectory() as directory:
+            for backend in ["object", "compact"]:
+                game = build_fixture("../model/grid", backend)
+                recorder = Recorder(
+                    game, fixture_name("../model/grid"), backend, interval=3
+                )
+                states = []
+                for command in commands:
+                    game.process_input(command)
+                    states.append(str(game.grid))
+                path = os.path.join(directory, backend + ".kwr")
+                recorder.save(path)
+
+                replay = Replay.load(path)
+                self.assertEqual("".join(replay.commands), commands)
+                self.assertEqual(str(replay.verify().grid), states[-1])
+                for step in [1, 5, 9, len(commands)]:
+                    self.assertEqual(str(replay.seek(step).grid), states[step - 1])
+                self.assertRaises(ReplayMismatch, replay.verify, fixture_name("global"))
+
+            results = list(verify_directory(directory, 2))
+            self.assertEqual([error for _, error, _ in results], [None, None])
+
+    def test_tail(self):
+        """commands after the last interval are checked against the final state"""
+        with tempfile.TemporaryDirectory() as directory:
+            game = build_fixture("../model/grid", "compact")
+            recorder = Recorder(game, fixture_name("../model/grid"), "compact")
+            game.process_input("1vv2^>3>>>")
+            path = os.path.join(directory, "tail.kwr")
+            recorder.save(path)
+            replay = Replay.load(path)
+            self.assertEqual(str(replay.verify().grid), str(game.grid))
+            replay.commands[-3:] = "<<<"
+            self.assertRaises(ReplayMismatch, replay.verify)
+
+    def test_shared_stacks(self):
+        """undo stacks equal to the previous checkpoint's are not written again"""
+        with tempfile.TemporaryDirectory() as directory:
+            game = build_fixture("../model/grid", "compact")
+            recorder = Recorder(
+                game, fixture_name("../model/grid"), "compact", interval=2
+            )
+            game.process_input("1>>vv<<^^>>" * 3)
+            shared = os.path.join(directory, "shared.kwr")
+            recorder.save(shared)
+            # checkpoints holding equal records that are distinct objects
+            checkpoints = recorder.replay.checkpoints
+            recorder.replay.checkpoints = [
+                pickle.loads(pickle.dumps(c)) for c in checkpoints
+            ]
+            copied = os.path.join(directory, "copied.kwr")
+            recorder.save(copied)
+            self.assertEqual(os.path.getsize(copied), os.path.getsize(shared))
+            self.assertEqual(
+                str(Replay.load(copied).seek(20).grid),
+                str(Replay.load(shared).seek(20).grid),
+            )
+
+
+class ServerTest(unittest.TestCase):
+    def test_sessions(self):
+        """clients play their own game of the shared level"""
+        App("s")
+        from view.server import Server
+
+        async def client(path, lines):
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write("".join(line + "\n" for line in lines).encode())
+            answers = [(await reader.readline()).decode().strip() for _ in lines]
+            writer.close()
+            await writer.wait_closed()
+            return answers
+
+        async def play(server):
+            await server.start()
+            solved, other = await asyncio.gather(
+                client(server.path, ["2<", "1>>>>>>", ">", "reset", "show"]),
+                client(server.path, ["1<", "metrics"]),
+            )
+            while server.sessions:
+                await asyncio.sleep(0.01)
+            server.game_over()
+            return solved, other
+
+        with tempfile.TemporaryDirectory() as directory:
+            server = Server(None)
+            server.path = os.path.join(directory, "kwirk.sock")
+            server.update(repr_fixture("solvable"), "1")
+            solved, other = asyncio.run(play(server))
+
+        self.assertEqual(
+            [answer.split()[0] for answer in solved[:4]],
+            ["running", "win", "over", "ok"],
+        )
+        self.assertEqual(solved[4], repr_fixture("solvable").split("\n")[0])
+        self.assertTrue(other[0].startswith("running 2 1"))
+        self.assertEqual(json.loads(other[1])["sessions_total"], 2)
+        self.assertEqual(len(server.levels), 1)
+
+    def test_solve(self):
+        """searches leave other sessions served, a session runs one at a time"""
+        App("s")
+        from view.server import Server
+
+        answered = []
+
+        async def client(path, lines, delay=0):
+            await asyncio.sleep(delay)
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write("".join(line + "\n" for line in lines).encode())
+            answers = [(await reader.readline()).decode().strip() for _ in lines]
+            answered.append(lines[0])
+            writer.close()
+            await writer.wait_closed()
+            return answers
+
+        async def play(server):
+            await server.start()
+            searching, other = await asyncio.gather(
+                client(server.path, ["solve", "solve", "1>"]),
+                client(server.path, ["metrics"], 0.2),
+            )
+            while server.sessions:
+                await asyncio.sleep(0.01)
+            server.game_over()
+            return searching, other
+
+        with tempfile.TemporaryDirectory() as directory:
+            server = Server(None)
+            server.path = os.path.join(directory, "kwirk.sock")
+            server.budget, server.solvers = 1500, 1
+            server.update(repr_fixture("../model/grid"), "1")
+            searching, other = asyncio.run(play(server))
+
+        self.assertEqual(answered, ["metrics", "solve"])
+        self.assertEqual(searching[:2], ["unknown", "busy"])
+        self.assertTrue(searching[2].startswith("running 2 1"))
+
+    def test_levels(self):
+        """clients switch to levels of the levels directory only,
+        failed lines are answered"""
+        App("s")
+        from view.server import Server
+
+        async def client(server, lines):
+            await server.start()
+            reader, writer = await asyncio.open_unix_connection(server.path)
+            writer.write("".join(line + "\n" for line in lines).encode())
+            answers = [(await reader.readline()).decode().strip() for _ in lines]
+            writer.close()
+            await writer.wait_closed()
+            while server.sessions:
+                await asyncio.sleep(0.01)
+            server.game_over()
+            return answers
+
+        with tempfile.TemporaryDirectory() as directory:
+            root = os.path.join(directory, "levels")
+            os.makedirs(os.path.join(directory, "pack"))
+            os.makedirs(root)
+            for name in ["solvable", "global"]:
+                for folder in [root, os.path.join(directory, "pack")]:
+                    with open(os.path.join(folder, name + ".txt"), "w") as level:
+                        level.write(repr_fixture(name))
+            with open(os.path.join(root, "broken.txt"), "w") as level:
+                level.write("#x#\n")
+            build(os.path.join(directory, "pack"), os.path.join(root, "levels.kwp"))
+
+            server = Server(None)
+            server.path = os.path.join(directory, "kwirk.sock")
+            server.root, server.kept_levels = root, 2
+            server.update(repr_fixture("solvable"), "1")
+            lines = [
+                "level ../pack/solvable.txt",
+                "level " + fixture_name("global"),
+                "level broken.txt",
+            ]
+            lines += [
+                "level levels.kwp",
+                "level levels.kwp:global",
+                "level solvable.txt",
+                "1>",
+                "show",
+            ]
+            answers = asyncio.run(client(server, lines))
+
+        self.assertEqual(
+            [answer.split()[0] for answer in answers[:6]], ["error"] * 4 + ["ok"] * 2
+        )
+        self.assertTrue(answers[6].startswith("running 2 1"))
+        self.assertEqual(answers[7], repr_fixture("solvable").split("\n")[0])
+        self.assertEqual(len(server.levels), 2)
+
+
+class Over:
+    """Headless app stub recording game over."""
+
+    over = False
+
+    def game_over(self):
+        self.over = True
+
+
+class SolverTest(unittest.TestCase):
+    def test_solve(self):
+        """shortest solution fills hole and turns turnstile"""
+        for method in ["bfs", "astar"]:
+            moves = solve(Grid(fixture_name("solvable")), method)
+            self.assertEqual(moves, ">>>>>>")
+            game = Game(Grid(fixture_name("solvable")), Over())
+            game.process_input(moves)
+            self.assertTrue(game.app.over)
+
+    def test_parallel(self):
+        """parallel search finds the serial breadth first solution"""
+        for backend in ["object", "compact"]:
+            expected = solve(Grid(fixture_name("solvable"), backend=backend), "bfs")
+            self.assertEqual(
+                solve_parallel(fixture_name("solvable"), backend, processes=2, chunk=4),
+                expected,
+            )
+            search = ParallelSearch(fixture_name("solvable"), backend, processes=2)
+            self.assertEqual(search.run(), expected)
+            self.assertEqual(len(search.run("astar")), len(expected))
+
+
+class AnalysisTest(unittest.TestCase):
+    def test_dead_squares(self):
+        """corners and cells out of pushing reach of the hole are dead"""
+        for backend in ["object", "compact"]:
+            grid = Grid(fixture_name("solvable"), backend=backend)
+            dead = {tuple(cell) for cell in np.argwhere(grid.dead_squares).tolist()}
+            self.assertEqual(
+                dead, {(1, 3), (1, 4), (1, 5), (2, 1), (2, 7), (3, 7), (4, 3), (4, 4)}
+            )
+            self.assertEqual(solve(grid, "bfs", prune=True), ">>>>>>")
+
+    def test_prune(self):
+        """pruned solutions win but may be longer or missing
+        when a crate is pushed aside"""
+        levels = {
+            "#####\n#  ##\n#@* #\n#*1O#\n#####\n": ("^<", None),
+            "######\n#*   #\n#  * #\n#@O*1#\n######\n": ("<^<<v", "^^<<v<v"),
+            repr_fixture("solvable"): (">>>>>>", ">>>>>>"),
+        }
+        for text, (shortest, pruned) in levels.items():
+            self.assertEqual(solve(Grid(text), "bfs"), shortest)
+            self.assertEqual(solve(Grid(text), "bfs", prune=True), pruned)
+            if pruned is not None:
+                game = Game(Grid(text), Over())
+                game.process_input(pruned)
+                self.assertTrue(game.app.over)
+
+    def test_frozen(self):
+        """crates side by side against a wall hold each other"""
+        grid = Grid(fixture_name("solvable"))
+        crates = {(1, 3), (1, 4)}
+        self.assertTrue(
+            analysis.frozen(crates, grid.blueprint, grid.dead_squares, (1, 3))
+        )
+        self.assertFalse(
+            analysis.frozen({(2, 3)}, grid.blueprint, grid.dead_squares, (2, 3))
+        )
+
+
+class BatchTest(unittest.TestCase):
+    def test_lockstep(self):
+        """boards end up as separate games would"""
+        moves = ["1vv2^>3>>>", "3>>>>", "2^<<<>>>>", "2>>v<"]
+        batch = Batch(fixture_name("../model/grid"), len(moves))
+        won, dead = batch.run(moves)
+        self.assertFalse(won.any() or dead.any())
+        board = batch.template
+        for index, move in enumerate(moves):
+            game = build_fixture("../model/grid")
+            game.process_input(move)
+            board.codes, board.versions = batch.codes[index], batch.versions[index]
+            self.assertEqual(str(board), str(game.grid), move)
+
+        batch = Batch(fixture_name("solvable"), 3)
+        won, dead = batch.run([">>>>>>", ">>>>>", "q>>>>>>"])
+        self.assertEqual(won.tolist(), [True, False, False])
+
+
+class PackTest(unittest.TestCase):
+    def test_pack(self):
+        """levels read from a pack match their source files"""
+        names = ["global", "solvable"]
+        with tempfile.TemporaryDirectory() as directory:
+            for name in names:
+                with open(os.path.join(directory, name + ".txt"), "w") as level:
+                    level.write(repr_fixture(name))
+            pack = os.path.join(directory, "fixtures.kwp")
+            self.assertEqual(build(directory, pack), 2)
+            for name in names:
+                grid = Grid(f"{pack}:{name}")
+                self.assertEqual(str(grid), str(Grid(fixture_name(name))))
+            self.assertRaises(KeyError, Grid, f"{pack}:missing")
+
+
+class StartupTest(unittest.TestCase):
+    def test_lazy_views(self):
+        """view backends are only imported once selected"""
+        check = (
+            "import sys, main; from view import App; App('t');"
+            " print(sorted(sys.modules))"
+        )
+        modules = subprocess.run(
+            [sys.executable, "-c", check], capture_output=True, text=True, check=True
+        )
+        self.assertIn("view.basic", modules.stdout)
+        for module in ["curses", "PyQt5", "view.curse", "view.graphic"]:
+            self.assertNotIn(f"'{module}'", modules.stdout)
+
+
+class GenerateTest(unittest.TestCase):
+    def test_generate(self):
+        """same levels from a seed whatever the workers,
+        within solution length bounds"""
+        with tempfile.TemporaryDirectory() as directory:
+            pack = os.path.join(directory, "levels.kwp")
+            with generate.Sink(pack) as sink:
+                generate.generate(4, sink, seed=3, lengths=(8, 12), processes=2)
+            with generate.Sink(os.path.join(directory, "levels")) as sink:
+                accepted, tried = generate.generate(
+                    4, sink, seed=3, lengths=(8, 12), processes=1
+                )
+            self.assertEqual(accepted, 4)
+            # lengths out of reach stop after max_attempts candidates
+            with generate.Sink(os.path.join(directory, "none")) as sink:
+                tried = generate.generate(
+                    1, sink, lengths=(500, 500), budget=200, max_attempts=12
+                )
+            self.assertEqual(tried, (0, 12))
+            self.assertEqual(len(os.listdir(os.path.join(directory, "levels"))), 8)
+
+            stream = io.StringIO()
+            self.assertEqual(
+                validate.validate(pack, validate.Report(stream), 20000, 2), (4, 0)
+            )
+            for row in map(json.loads, stream.getvalue().splitlines()):
+                name = row["level"].rpartition(":")[2]
+                with open(os.path.join(directory, "levels", name + ".txt")) as level:
+                    self.assertEqual(str(Grid(level.read())), str(Grid(row["level"])))
+                self.assertTrue(8 <= len(row["solution"]) <= 12)
+
+
+class ValidateTest(unittest.TestCase):
+    def test_validate(self):
+        """one row per level of a directory or pack, with the failed checks"""
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "solvable.txt"), "w") as level:
+                level.write(repr_fixture("solvable"))
+            with open(os.path.join(directory, "walled.txt"), "w") as level:
+                level.write("######\n#1#@ #\n######\n#/   #\n######\n")
+            pack = os.path.join(directory, "levels.kwp")
+            build(directory, pack)
+
+            for target in [directory, pack]:
+                stream = io.StringIO()
+                self.assertEqual(
+                    validate.validate(target, validate.Report(stream), 1000, 2), (2, 1)
+                )
+                rows = sorted(
+                    map(json.loads, stream.getvalue().splitlines()),
+                    key=lambda row: row["level"],
+                )
+                self.assertEqual(rows[0]["solution"], ">>>>>>")
+                self.assertEqual(
+                    rows[1]["errors"],
+                    ["arms: unconnected arm at (3, 1)", "door: out of reach"],
+                )
+
+
+class CacheTest(unittest.TestCase):
+    def test_solve(self):
+        """solutions are found once per layout, whatever its source,
+        limits are remembered"""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = Cache(os.path.join(directory, "cache.sqlite"))
+            self.assertEqual(
+                solve(Grid(fixture_name("solvable")), cache=cache), ">>>>>>"
+            )
+            self.assertEqual(
+                solve(
+                    Grid(repr_fixture("solvable"), backend="chunked"),
+                    "bfs",
+                    cache=cache,
+                ),
+                ">>>>>>",
+            )
+            self.assertEqual(len(cache), 1)
+
+            grid = Grid(fixture_name("../model/grid"))
+            self.assertRaises(SearchLimit, solve, grid, cache=cache, max_nodes=5)
+            self.assertEqual(cache.get(fingerprint(grid), "solve")["nodes"], 6)
+            self.assertRaises(SearchLimit, solve, grid, cache=cache, max_nodes=4)
+            # the grid is left as it was, in state and hash
+            self.assertEqual(
+                grid.state_hash, Grid(fixture_name("../model/grid")).state_hash
+            )
+
+            App("s")
+            from view.server import Server, Session
+
+            server = Server(None)
+            server.cache = cache
+            session = Session(
+                fixture_name("solvable"), server.level(fixture_name("solvable"))
+            )
+            session.game.run(">")
+            self.assertEqual(
+                asyncio.run(server._answer(session, "solve")), "solution >>>>>"
+            )
+            server.game_over()
+            self.assertEqual(len(cache), 3)
+
+    def test_eviction(self):
+        """least recently used entries go first"""
+        with tempfile.TemporaryDirectory() as directory:
+            cache = Cache(os.path.join(directory, "cache.sqlite"), limit=2)
+            cache.put("a", "solve", 1)
+            cache.put("b", "solve", 2)
+            self.assertEqual(cache.get("a", "solve"), 1)
+            cache.put("c", "solve", 3)
+            self.assertEqual([cache.get(key, "solve") for key in "abc"], [1, None, 3])
+
+    def test_validate(self):
+        """workers share the cache, a second run reports the same rows"""
+        with tempfile.TemporaryDirectory() as directory:
+            for name in ["solvable", "global"]:
+                with open(os.path.join(directory, name + ".txt"), "w") as level:
+                    level.write(repr_fixture(name))
+            cache = Cache(os.path.join(directory, "cache.sqlite"))
+            reports = []
+            for _ in range(2):
+                stream = io.StringIO()
+                validate.validate(
+                    directory, validate.Report(stream), 1000, 2, cache=cache
+                )
+                rows = sorted(
+                    map(json.loads, stream.getvalue().splitlines()),
+                    key=lambda row: row["level"],
+                )
+                reports.append([{**row, "seconds": None} for row in rows])
+            self.assertEqual(reports[0], reports[1])
+            self.assertEqual(reports[0][1]["solution"], ">>>>>>")
+            # a verdict and a solve result per level
+            self.assertEqual(len(cache), 4)
+
+
+class FuzzTest(unittest.TestCase):
+    def test_engines_agree(self):
+        """random cases play the same on every engine,
+        an arm between two pivots included"""
+        self.assertEqual(fuzz.fuzz(20, length=100, processes=2)[2], 0)
+        shared = "########\n#      #\n#  %/% #\n#2 /   #\n########\n"
+        self.assertEqual(fuzz.play(shared, "2v>^>"), (5, None))
+
+    def test_shrink(self):
+        """a mismatch is found and shrunk to a short reproducer"""
+
+        @Grid.register("stuck")
+        class Stuck(CompactGrid):
+            def _push(self, index, target, direction):
+                pass
+
+        try:
+            text, commands = (
+                "#########\n#  1* * #\n# *o O @#\n#########\n",
+                "<^v>>v^>>>",
+            )
+            step, mismatch = fuzz.play(text, commands, ("stuck",))
+            self.assertEqual((step, *mismatch[:2]), (5, 4, "stuck"))
+            layout, reproducer = fuzz.shrink(text, commands, "stuck")
+            self.assertEqual(reproducer, ">")
+            self.assertEqual(layout, "#########\n#  1*   #\n#       #\n#########\n")
+            self.assertIsNotNone(fuzz.play(layout, reproducer, ("stuck",))[1])
+        finally:
+            del Grid.backends["stuck"]
+
+    def test_bench(self):
+        """mismatches fail the bench and are reported apart from budgets"""
+        import bench.__main__ as bench_main
+
+        mismatch = {"seed": 0, "case": 7, "engine": "stuck", "step": 4}
+        mismatch.update(
+            {"expected": "", "observed": "", "layout": "#1*@#\n", "commands": ">"}
+        )
+
+        def play(cases, report=None):
+            report(mismatch)
+            return cases, 10, 1, 1.0
+
+        results = {"meta": {}, "results": {"startup/import": 0.1}}
+        with tempfile.TemporaryDirectory() as directory:
+            output = io.StringIO()
+            argv = ["--fuzz", "1", "--output", os.path.join(directory, "results.json")]
+            argv += ["--baseline", os.path.join(directory, "none.json")]
+            with mock.patch.object(suite, "run", return_value=results):
+                with mock.patch.object(fuzz, "fuzz", play), redirect_stdout(output):
+                    self.assertEqual(bench_main.main(argv), 1)
+        self.assertIn(
+            "MISMATCH stuck seed 0 case 7: '>' on\n#1*@#\n", output.getvalue()
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
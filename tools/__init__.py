@@ -0,0 +1 @@
+"""Command line tools around levels, run as python -m tools.<name>."""
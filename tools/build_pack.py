@@ -0,0 +1,43 @@
+"""Build a level pack from a directory of .txt layouts.
+
+python -m tools.build_pack levels/ levels.kwp
+Level names are file names without extension, a sibling <name>.json
+holds optional metadata.
+"""
+
+import argparse
+import json
+import os
+
+from model.pack import PackWriter
+
+
+def build(directory, path):
+    """Write every layout of directory into pack at path, return level count."""
+    names = sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".txt"))
+    with PackWriter(path) as pack:
+        for name in names:
+            with open(os.path.join(directory, name + ".txt")) as layout_file:
+                layout = layout_file.read()
+            rows = layout.splitlines()
+            meta = {"height": len(rows), "width": max(map(len, rows), default=0)}
+            sidecar = os.path.join(directory, name + ".json")
+            if os.path.exists(sidecar):
+                with open(sidecar) as meta_file:
+                    meta.update(json.load(meta_file))
+            pack.add(name, layout, meta)
+    return len(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("directory")
+    parser.add_argument("pack")
+    args = parser.parse_args()
+    print(f"{build(args.directory, args.pack)} levels written to {args.pack}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Play random layouts and commands on every engine and compare them step by step.
+
+python -m tools.fuzz --cases 2000 --processes 8
+python -m tools.fuzz --duration 60 --output failures.jsonl
+The object model is the reference. After each command, every other grid backend
+must show the same board, outcome, active character and state hash. Batch boards
+are compared up to their first undo or redo, which they do not support.
+A mismatch is shrunk to a short command string on a simpler layout
+and written as one JSON line. Cases are drawn from the seed, a failure is replayed
+with its seed and case number.
+"""
+
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from control import Game
+from model import Grid
+from model.batch import Batch
+from .generate import candidate
+
+
+# layout parameter -> (low, high) bounds drawn from
+SHAPE = {
+    "height": (5, 10),
+    "width": (5, 14),
+    "characters": (1, 4),
+    "crates": (0, 5),
+    "holes": (0, 4),
+    "turnstiles": (0, 4),
+}
+WALLS = 0.1
+ENGINES = tuple(sorted(set(Grid.backends) - {"object"})) + ("batch",)
+
+
+def case(seed, index, length):
+    """Layout text and command string of case number index of seed."""
+    rng = random.Random(f"fuzz:{seed}:{index}")
+    shape = {name: rng.randint(*bounds) for name, bounds in SHAPE.items()}
+    text = candidate(rng, walls=WALLS, **shape)
+    switches = "1234"[: shape["characters"]]
+    # mostly moves, some switches, undo and redo
+    alphabet = "^>v<" * 6 + switches * 2 + "uur"
+    return text, "".join(rng.choice(alphabet) for _ in range(length))
+
+
+class _Board:
+    """Batch of one board, played and observed like a game."""
+
+    def __init__(self, text):
+        self.batch = Batch(text, 1)
+        self.view = copy.copy(self.batch.template)
+
+    def step(self, command):
+        if command in "ur":
+            return None
+        self.batch.step(command)
+        self.view.codes, self.view.versions = (
+            self.batch.codes[0],
+            self.batch.versions[0],
+        )
+        status = "win" if self.batch.won[0] else "dead" if self.batch.dead[0] else None
+        return str(self.view), status, str(self.batch.active[0] + 1)
+
+
+class _Player:
+    """Game on one grid backend, observed after each command."""
+
+    def __init__(self, text, backend):
+        self.game = Game(Grid(text, backend=backend), None)
+
+    def step(self, command):
+        outcome = self.game.run(command)
+        return str(self.game.grid), outcome.status, outcome.active, outcome.state_hash
+
+
+def _observe(player, command):
+    """Observation of one step, an error is observed as its message."""
+    try:
+        return player.step(command)
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+
+
+def _agree(expected, observed):
+    """Whether an engine observed what the reference did, batch boards have no hash."""
+    if isinstance(expected, tuple) and isinstance(observed, tuple):
+        return observed == expected[: len(observed)]
+    return observed == expected
+
+
+def play(text, commands, engines=ENGINES):
+    """Play commands on the reference and each engine until the game ends.
+    return steps played and (step, engine, expected, observed) of the first mismatch
+    or None.
+    """
+    try:
+        reference = _Player(text, "object")
+    except Exception:
+        return 0, None
+    players = {}
+    for engine in engines:
+        try:
+            players[engine] = (
+                _Board(text) if engine == "batch" else _Player(text, engine)
+            )
+        except Exception as error:
+            return 0, (0, engine, "parsed", f"{type(error).__name__}: {error}")
+
+    for step, command in enumerate(commands):
+        expected = _observe(reference, command)
+        for engine, player in list(players.items()):
+            observed = _observe(player, command)
+            if observed is None:
+                # engine stops being compared
+                del players[engine]
+            elif not _agree(expected, observed):
+                return step + 1, (step, engine, expected, observed)
+        if not isinstance(expected, tuple) or expected[1] is not None:
+            return step + 1, None
+    return len(commands), None
+
+
+def shrink(text, commands, engine):
+    """Shorter commands and a simpler layout still showing a mismatch on engine :
+    commands are cut by halves, then quarters and so on,
+    layout cells blanked one by one.
+    """
+    step = play(text, commands, (engine,))[1][0]
+    commands = commands[: step + 1]
+
+    size = len(commands) // 2
+    while size:
+        start, shrunk = 0, False
+        while start < len(commands):
+            shorter = commands[:start] + commands[start + size :]
+            if shorter and play(text, shorter, (engine,))[1] is not None:
+                commands, shrunk = shorter, True
+            else:
+                start += size
+        # single commands are tried again until none can go
+        if size > 1 or not shrunk:
+            size //= 2
+
+    rows = [list(row) for row in text.splitlines()]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, len(rows) - 1):
+            for j in range(1, len(rows[i]) - 1):
+                # characters are kept for switches to keep their meaning
+                if rows[i][j] in " 1234":
+                    continue
+                skin, rows[i][j] = rows[i][j], " "
+                simpler = "".join("".join(row) + "\n" for row in rows)
+                if play(simpler, commands, (engine,))[1] is not None:
+                    changed = True
+                else:
+                    rows[i][j] = skin
+    return "".join("".join(row) + "\n" for row in rows), commands
+
+
+def _fuzz(job):
+    """Play cases start to stop of seed, return (steps played, failure rows)."""
+    seed, start, stop, length, engines = job
+    steps, failures = 0, []
+    for index in range(start, stop):
+        text, commands = case(seed, index, length)
+        played, mismatch = play(text, commands, engines)
+        steps += played
+        if mismatch is None:
+            continue
+        step, engine, expected, observed = mismatch
+        layout, reproducer = shrink(text, commands, engine)
+        failures.append(
+            {
+                "seed": seed,
+                "case": index,
+                "engine": engine,
+                "step": step,
+                "expected": repr(expected),
+                "observed": repr(observed),
+                "layout": layout,
+                "commands": reproducer,
+            }
+        )
+    return steps, failures
+
+
+def fuzz(
+    cases=None,
+    duration=None,
+    seed=0,
+    length=200,
+    engines=ENGINES,
+    processes=None,
+    chunk=20,
+    report=None,
+):
+    """Play cases of length commands, or as many as fit in duration seconds,
+    on processes workers.
+    report is called with each failure row.
+    return (cases played, steps played, failure count, seconds).
+    """
+    start = time.perf_counter()
+    played = steps = failed = 0
+    batch = 4 * (processes or os.cpu_count())
+    with multiprocessing.Pool(processes) as pool:
+        while cases is None or played < cases:
+            if duration is not None and time.perf_counter() - start > duration:
+                break
+            stops = [played + chunk * (index + 1) for index in range(batch)]
+            if cases is not None:
+                stops = sorted({min(stop, cases) for stop in stops})
+            jobs = [
+                (seed, low, high, length, engines)
+                for low, high in zip([played] + stops, stops)
+            ]
+            for job_steps, failures in pool.imap_unordered(_fuzz, jobs):
+                steps += job_steps
+                failed += len(failures)
+                for failure in failures:
+                    if report is not None:
+                        report(failure)
+            played = stops[-1]
+    return played, steps, failed, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--cases", type=int, help="cases to play, 1000 unless a duration is given"
+    )
+    parser.add_argument("--duration", type=float, help="seconds to play cases for")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--length", type=int, default=200, help="commands per case")
+    parser.add_argument("--engines", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument(
+        "--processes", type=int, help="worker count, all cores by default"
+    )
+    parser.add_argument("--output", help="failures file, stdout by default")
+    args = parser.parse_args()
+
+    cases = args.cases if args.cases or args.duration else 1000
+    stream = open(args.output, "w") if args.output else sys.stdout
+
+    def report(failure):
+        stream.write(json.dumps(failure) + "\n")
+        stream.flush()
+
+    try:
+        played, steps, failed, seconds = fuzz(
+            cases,
+            args.duration,
+            args.seed,
+            args.length,
+            tuple(args.engines),
+            args.processes,
+            report=report,
+        )
+    finally:
+        if args.output:
+            stream.close()
+    print(
+        f"{played} cases, {steps} steps in {seconds:.1f} s"
+        f" ({steps / seconds * 60:.0f} steps per minute), {failed} failures",
+        file=sys.stderr,
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
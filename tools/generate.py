@@ -0,0 +1,233 @@
+"""Generate solvable levels at a chosen difficulty.
+
+python -m tools.generate levels/ --count 50 --seed 7 --min-length 20 --max-length 80
+python -m tools.generate levels.kwp --count 50 --seed 7
+Candidates are drawn from the seed, checked and solved in parallel, and levels whose
+shortest solution length is within bounds are written as soon as they are accepted,
+in candidate order : a seed always gives the same levels.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+
+from model.cache import Cache
+from model.pack import PackWriter
+from .validate import check
+
+
+# layout parameters and their default
+SHAPE = {
+    "height": 8,
+    "width": 12,
+    "characters": 2,
+    "crates": 2,
+    "holes": 2,
+    "turnstiles": 1,
+    "walls": 0.15,
+}
+
+
+def candidate(rng, height, width, characters, crates, holes, turnstiles, walls):
+    """Random walled layout text, most counts are upper bounds.
+    Holes are one or two crates deep, turnstiles have one to three arms.
+    """
+    rows = (
+        [["#"] * width]
+        + [["#"] + [" "] * (width - 2) + ["#"] for _ in range(height - 2)]
+        + [["#"] * width]
+    )
+    inside = [(i, j) for i in range(1, height - 1) for j in range(1, width - 1)]
+    for i, j in inside:
+        if rng.random() < walls:
+            rows[i][j] = "#"
+
+    for _ in range(rng.randint(0, turnstiles)):
+        i, j = rng.choice(inside)
+        sides = [(i + di, j + dj) for di, dj in ((-1, 0), (0, 1), (1, 0), (0, -1))]
+        if not 2 <= i <= height - 3 or not 2 <= j <= width - 3:
+            continue
+        rows[i][j] = "%"
+        for side in rng.sample(sides, rng.randint(1, 3)):
+            rows[side[0]][side[1]] = "/"
+        # room for arms to sweep
+        for di in (-1, 1):
+            for dj in (-1, 1):
+                rows[i + di][j + dj] = " "
+
+    free = [cell for cell in inside if rows[cell[0]][cell[1]] == " "]
+    rng.shuffle(free)
+    skins = ["@"] + list("1234"[:characters])
+    skins += [rng.choice("oO") for _ in range(rng.randint(0, holes))]
+    skins += ["*"] * rng.randint(0, crates)
+    for skin, (i, j) in zip(skins, free):
+        rows[i][j] = skin
+    return "".join("".join(row) + "\n" for row in rows)
+
+
+def _judge(job):
+    """Check candidate number index of seed, return (index, text, report row)."""
+    seed, index, shape, budget, cache = job
+    text = candidate(random.Random(f"{seed}:{index}"), **shape)
+    return index, text, check(text, budget, cache)
+
+
+class Sink:
+    """Write accepted levels to a directory of .txt layouts with .json metadata,
+    or to a level pack when path ends with .kwp.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pack = None
+        if path.endswith(".kwp"):
+            self.pack = PackWriter(path)
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def add(self, name, text, meta):
+        if self.pack is not None:
+            self.pack.add(name, text, meta)
+            return
+        with open(os.path.join(self.path, name + ".txt"), "w") as layout_file:
+            layout_file.write(text)
+        with open(os.path.join(self.path, name + ".json"), "w") as meta_file:
+            json.dump(meta, meta_file)
+
+    def close(self):
+        if self.pack is not None:
+            self.pack.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def generate(
+    count,
+    sink,
+    seed=0,
+    lengths=(1, None),
+    budget=20000,
+    processes=None,
+    progress=None,
+    cache=None,
+    max_attempts=10000,
+    **shape,
+):
+    """Write count levels to sink whose shortest solution length is within lengths
+    bounds, on processes workers, trying max_attempts candidates at most. shape
+    overrides SHAPE parameters, candidates are solved within budget search nodes,
+    see validate.check for cache. return the number of levels written and of
+    candidates tried.
+    """
+    shape = {**SHAPE, **shape}
+    low, high = lengths
+    accepted = tried = 0
+    batch = 8 * (processes or os.cpu_count())
+    with multiprocessing.Pool(processes) as pool:
+        while accepted < count and tried < max_attempts:
+            indices = range(tried, min(tried + batch, max_attempts))
+            jobs = [(seed, index, shape, budget, cache) for index in indices]
+            # results come in candidate order, whatever the worker count
+            for index, text, row in pool.imap(_judge, jobs):
+                tried = index + 1
+                length = len(row["solution"]) if row["valid"] else None
+                if (
+                    length is not None
+                    and low <= length
+                    and (high is None or length <= high)
+                ):
+                    rows = text.splitlines()
+                    meta = {
+                        "seed": seed,
+                        "candidate": index,
+                        "solution": row["solution"],
+                        "length": length,
+                    }
+                    sink.add(
+                        f"s{seed}-{index:06d}",
+                        text,
+                        {**meta, "height": len(rows), "width": len(rows[0])},
+                    )
+                    accepted += 1
+                if progress is not None:
+                    progress(tried, accepted)
+                if accepted == count:
+                    break
+    return accepted, tried
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("output", help="directory, or level pack if ending with .kwp")
+    parser.add_argument("--count", type=int, default=10, help="levels to write")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--min-length", type=int, default=1, help="shortest solution length allowed"
+    )
+    parser.add_argument(
+        "--max-length", type=int, help="longest solution length allowed"
+    )
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=20000,
+        help="search nodes allowed to solve a candidate",
+    )
+    parser.add_argument(
+        "--processes", type=int, help="worker count, all cores by default"
+    )
+    parser.add_argument(
+        "--max-attempts", type=int, default=10000, help="candidates to try at most"
+    )
+    parser.add_argument(
+        "--cache",
+        default=os.environ.get("KWIRK_CACHE"),
+        help="results cache file, $KWIRK_CACHE by default",
+    )
+    for name, default in SHAPE.items():
+        parser.add_argument(f"--{name}", type=type(default), default=default)
+    args = parser.parse_args()
+
+    def progress(tried, accepted):
+        print(
+            f"\r{accepted} levels accepted out of {tried} candidates",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    shape = {name: getattr(args, name) for name in SHAPE}
+    with Sink(args.output) as sink:
+        cache = Cache(args.cache) if args.cache else None
+        lengths = args.min_length, args.max_length
+        accepted, tried = generate(
+            args.count,
+            sink,
+            args.seed,
+            lengths,
+            args.budget,
+            args.processes,
+            progress,
+            cache,
+            args.max_attempts,
+            **shape,
+        )
+    print(file=sys.stderr)
+    print(
+        f"{accepted} of {args.count} levels written, {tried} candidates tried",
+        file=sys.stderr,
+    )
+    sys.exit(0 if accepted == args.count else 1)
+
+
+if __name__ == "__main__":
+    main()
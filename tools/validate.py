@@ -0,0 +1,218 @@
+"""Check every level of a directory of .txt layouts or of a level pack.
+
+python -m tools.validate levels/ --output report.jsonl
+python -m tools.validate levels.kwp --output report.csv --budget 1000 --cache c.sqlite
+Levels are checked in parallel, one report row is written per level as soon as it
+is done, in completion order. Progress goes to stderr.
+With a cache, levels checked before with the same budget are not checked again,
+whatever their name.
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+from model import Grid
+from model import analysis
+from model import layout
+from model.cache import Cache, key
+from model.pack import Pack
+from solver import SearchLimit, solve
+
+
+FIELDS = ["level", "valid", "errors", "characters", "solution", "seconds"]
+
+
+def sources(target):
+    """Level identifiers of a directory or a pack, in name order."""
+    if os.path.isdir(target):
+        for name in sorted(os.listdir(target)):
+            if name.endswith(".txt"):
+                yield os.path.join(target, name)
+    else:
+        with Pack(target) as pack:
+            names = list(pack.names())
+        for name in names:
+            yield f"{target}:{name}"
+
+
+def _errors(grid, row):
+    """Yield error messages of the structural checks, filling row on the way."""
+    try:
+        layout.check(grid.blueprint)
+    except Exception as error:
+        yield f"walls: {error}"
+
+    ids = grid.versions[grid.blueprint == layout.CHARACTER]
+    row["characters"] = len(ids)
+    if not 1 <= len(ids) <= 4:
+        yield f"characters: {len(ids)} found, 1 to 4 expected"
+    elif len(set(ids.tolist())) != len(ids):
+        yield "characters: duplicate character"
+
+    for i, j in np.argwhere(
+        (grid.blueprint == layout.ARM) & (grid.owner == 0)
+    ).tolist():
+        yield f"arms: unconnected arm at ({i}, {j})"
+
+    doors = np.argwhere(grid.blueprint == layout.DOOR)
+    if not len(doors):
+        yield "door: no door"
+        return
+    # crates, holes and turnstiles may all get out of the way
+    free = ~np.isin(grid.blueprint, (layout.WALL, layout.PIVOT))
+    starts = [tuple(character.coords) for character in grid.characters.values()]
+    if not analysis.reachable(free, starts)[tuple(doors.T)].any():
+        yield "door: out of reach"
+
+
+def _solve(source, budget, row, cache=None):
+    """Error message if no solution is found within budget search nodes."""
+    try:
+        row["solution"] = solve(
+            Grid(source, backend="compact"), cache=cache, max_nodes=budget
+        )
+    except SearchLimit:
+        return "solve: not solved within budget"
+    if row["solution"] is None:
+        return "solve: no solution"
+    return None
+
+
+def check(source, budget=None, cache=None):
+    """Report row of one level, solvability is only searched with a node budget
+    and for levels passing the other checks.
+    Verdicts are looked up in and added to cache if any.
+    """
+    start = time.perf_counter()
+    row = {
+        "level": source,
+        "valid": True,
+        "errors": [],
+        "characters": None,
+        "solution": None,
+    }
+    try:
+        grid = Grid(source, check_wall=False, backend="compact")
+    except Exception as error:
+        row["errors"].append(f"parse: {error}")
+    else:
+        entry = (key(grid), f"validate:{budget}") if cache is not None else None
+        verdict = cache.get(*entry) if cache is not None else None
+        if verdict is None:
+            row["errors"] += _errors(grid, row)
+            if budget is not None and not row["errors"]:
+                error = _solve(source, budget, row, cache)
+                if error is not None:
+                    row["errors"].append(error)
+            if cache is not None:
+                cache.put(
+                    *entry,
+                    {name: row[name] for name in ("errors", "characters", "solution")},
+                )
+        else:
+            row.update(verdict)
+    row["valid"] = not row["errors"]
+    row["seconds"] = round(time.perf_counter() - start, 6)
+    return row
+
+
+def _check(job):
+    return check(*job)
+
+
+class Report:
+    """Write rows as JSON lines or CSV to a stream."""
+
+    def __init__(self, stream, fmt="jsonl"):
+        self.stream = stream
+        self.writer = None
+        if fmt == "csv":
+            self.writer = csv.DictWriter(stream, FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.writer is None:
+            self.stream.write(json.dumps(row) + "\n")
+        else:
+            self.writer.writerow({**row, "errors": "; ".join(row["errors"])})
+        self.stream.flush()
+
+
+def validate(target, report, budget=None, processes=None, progress=None, cache=None):
+    """Check all levels of target on processes workers, writing rows to report.
+    return (level count, invalid count).
+    """
+    count = invalid = 0
+    jobs = ((source, budget, cache) for source in sources(target))
+    with multiprocessing.Pool(processes) as pool:
+        for row in pool.imap_unordered(_check, jobs, chunksize=4):
+            count += 1
+            invalid += not row["valid"]
+            report.write(row)
+            if progress is not None:
+                progress(count, invalid)
+    return count, invalid
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("target", help="directory of .txt layouts or level pack")
+    parser.add_argument("--output", help="report file, stdout by default")
+    parser.add_argument(
+        "--format",
+        choices=["jsonl", "csv"],
+        help="report format, from output extension by default",
+    )
+    parser.add_argument(
+        "--budget", type=int, help="search nodes allowed to prove each level solvable"
+    )
+    parser.add_argument(
+        "--processes", type=int, help="worker count, all cores by default"
+    )
+    parser.add_argument(
+        "--cache",
+        default=os.environ.get("KWIRK_CACHE"),
+        help="results cache file, $KWIRK_CACHE by default",
+    )
+    args = parser.parse_args()
+
+    fmt = args.format or (
+        "csv" if args.output and args.output.endswith(".csv") else "jsonl"
+    )
+    stream = open(args.output, "w", newline="") if args.output else sys.stdout
+
+    def progress(count, invalid):
+        print(
+            f"\r{count} levels checked, {invalid} invalid",
+            end="",
+            file=sys.stderr,
+            flush=True,
+        )
+
+    try:
+        cache = Cache(args.cache) if args.cache else None
+        _, invalid = validate(
+            args.target,
+            Report(stream, fmt),
+            args.budget,
+            args.processes,
+            progress,
+            cache,
+        )
+    finally:
+        if args.output:
+            stream.close()
+    print(file=sys.stderr)
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Replay every .kwr file of a directory headless and check its checkpoints.
+
+python -m tools.verify_replays logs/
+One line is printed per replay as soon as it is verified, the exit status is 1
+if any replay does not match its level.
+"""
+
+import argparse
+import sys
+
+from control.replay import verify_directory
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("directory")
+    parser.add_argument(
+        "--processes", type=int, help="worker count, all cores by default"
+    )
+    args = parser.parse_args()
+
+    failed = 0
+    for path, error, seconds in verify_directory(args.directory, args.processes):
+        failed += error is not None
+        print(
+            f"{path} {'ok' if error is None else error} ({seconds:.3f} s)", flush=True
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
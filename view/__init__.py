@@ -1,6 +1,3 @@
-from importlib import import_module
+"""Backends are loaded on demand, see App."""
 
 from .apps import App
-
-for app in [".basic", ".curse", ".graphic"]:
-    import_module(app, __package__)
@@ -1,15 +1,26 @@
+from importlib import import_module
+
+
 class App:
-    registered={}
+    """Interactive applications by key.
+    A backend module is imported only when its key is asked for,
+    so headless runs never load curses or Qt."""
+
+    registered = {}
+    modules = {"t": ".basic", "c": ".curse", "g": ".graphic", "s": ".server"}
 
     def __new__(cls, key):
-        return cls.registered[key]
+        if key not in cls.registered and key in cls.modules:
+            import_module(cls.modules[key], __package__)
+        try:
+            return cls.registered[key]
+        except KeyError:
+            raise KeyError(f"Unregistered app: {key}")
 
     @classmethod
     def register(cls, key):
         def deco(app):
-            try:
-                cls.registered[key] = app
-            except KeyError as ke:
-                raise ke(f"Unregistered app: {key}")
+            cls.registered[key] = app
             return app
+
         return deco
@@ -1,5 +1,7 @@
 """Interactive applications for command line or GUI gameplay."""
 
+import shutil
+
 from .apps import App
 
 
@@ -12,6 +14,12 @@ class Basic:
         self._buffer = None
         self._over = False
 
+    @property
+    def viewport(self):
+        """Board cells printed : the terminal, less the input line."""
+        columns, lines = shutil.get_terminal_size()
+        return lines - 1, columns
+
     def update(self, grid, _):
         """Register grid changes."""
         if self._buffer is None:
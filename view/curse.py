@@ -5,13 +5,22 @@ from .apps import App
 
 @App.register("c")
 class Keyboard:
+    """Terminal gameplay, only changed cells are written to the screen.
+    Boards larger than the terminal are shown through a viewport
+    that follows the active character.
+    """
+
     def __init__(self, observer, *a):
         self.keys = {"up": "^", "right": ">", "down": "v", "left": "<"}
 
         self.observer = observer
-        self.buffer = None
+        self._buffer = None
         self._over = False
 
+        # rows on screen and screen size of last draw
+        self._frame = None
+        self._screen = None
+
         self.stdscr = curses.initscr()
         curses.noecho()
         curses.cbreak()
@@ -20,9 +29,16 @@ class Keyboard:
     def __del__(self):
         self._clean()
 
-    def update(self, grid, _):
+    @property
+    def viewport(self):
+        """Board cells the screen has room for,
+        the bottom right corner of the screen can not be written to."""
+        height, width = self.stdscr.getmaxyx()
+        return height, width - 1
+
+    def update(self, grid, active_character):
+        """Register grid changes, drawing waits for pending keys to be handled."""
         self._buffer = grid
-        self._draw()
 
     def getkey(self):
         key = self.stdscr.getkey()
@@ -32,12 +48,27 @@ class Keyboard:
             pass
         return key
 
+    def _pending_keys(self):
+        """Wait for a key, then drain all keys already typed (key repeat)."""
+        keys = [self.getkey()]
+        self.stdscr.nodelay(True)
+        try:
+            while True:
+                keys.append(self.getkey())
+        except curses.error:
+            pass
+        finally:
+            self.stdscr.nodelay(False)
+        return keys
 
     def launch(self):
         try:
+            self._draw()
             while not self._over:
-                self.observer(self.getkey())()
-                self.stdscr.refresh()
+                for key in self._pending_keys():
+                    self.observer(key)()
+                    if self._over:
+                        break
                 self._draw()
         finally:
             self._clean()
@@ -53,4 +84,30 @@ class Keyboard:
 
     def _draw(self):
         assert self._buffer is not None
-        self.stdscr.addstr(0, 0, self._buffer)
+        height, width = self.viewport
+        if (height, width) != self._screen:
+            self._frame = None
+            self.stdscr.erase()
+        self._screen = height, width
+
+        # cut in case the screen shrank since the board was rendered
+        frame = [row[:width] for row in self._buffer.split("\n")[:height]]
+        for i, row in enumerate(frame):
+            previous = self._frame[i] if self._frame is not None else ""
+            if row == previous:
+                continue
+            start = 0
+            while (
+                start < min(len(row), len(previous)) and row[start] == previous[start]
+            ):
+                start += 1
+            end = len(row)
+            while (
+                end > start
+                and end <= len(previous)
+                and row[end - 1] == previous[end - 1]
+            ):
+                end -= 1
+            self.stdscr.addstr(i, start, row[start:end])
+        self._frame = frame
+        self.stdscr.refresh()
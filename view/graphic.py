@@ -8,6 +8,66 @@ import PyQt5.QtGui as gui
 from .apps import App
 
 
+# above this many cells the board is painted on a single widget
+LABEL_LIMIT = 64 * 64
+# most rows and columns of board shown, larger boards follow the active character
+VIEWPORT = (60, 100)
+
+
+class LabelBoard(widgets.QWidget):
+    """One QLabel per cell, clicking one walks the active character there."""
+
+    def __init__(self, shape, icons, observer):
+        super().__init__()
+        self.icons = icons
+        self.labels = np.empty(shape, widgets.QLabel)
+        layout = widgets.QGridLayout()
+        layout.setSpacing(0)
+        for (i, j), _ in np.ndenumerate(self.labels):
+            self.labels[i, j] = widgets.QLabel()
+            self.labels[i, j].mousePressEvent = lambda event, cell=(i, j): observer(
+                cell
+            )()
+            layout.addWidget(self.labels[i, j], i, j)
+        self.setLayout(layout)
+
+    def draw(self, i, j, symbol):
+        self.labels[i, j].setPixmap(self.icons[symbol])
+
+
+class CanvasBoard(widgets.QWidget):
+    """Sprites painted with QPainter onto one surface,
+    only the rectangles of drawn cells are repainted."""
+
+    def __init__(self, shape, icons, observer):
+        super().__init__()
+        self.observer = observer
+        self.icons = icons
+        self.cell = icons[" "].width()
+        self.symbols = np.full(shape, " ")
+        self.setFixedSize(shape[1] * self.cell, shape[0] * self.cell)
+
+    def draw(self, i, j, symbol):
+        self.symbols[i, j] = symbol
+        self.update(j * self.cell, i * self.cell, self.cell, self.cell)
+
+    def mousePressEvent(self, event):
+        """Walk the active character to the clicked cell."""
+        self.observer((event.y() // self.cell, event.x() // self.cell))()
+
+    def paintEvent(self, event):
+        rect = event.rect()
+        top, left = rect.top() // self.cell, rect.left() // self.cell
+        bottom, right = rect.bottom() // self.cell + 1, rect.right() // self.cell + 1
+        painter = gui.QPainter(self)
+        for i in range(top, min(bottom, self.symbols.shape[0])):
+            for j in range(left, min(right, self.symbols.shape[1])):
+                painter.drawPixmap(
+                    j * self.cell, i * self.cell, self.icons[self.symbols[i, j]]
+                )
+        painter.end()
+
+
 @App.register("g")
 class Graphic(widgets.QWidget):
     """GUI gameplay with PyQt"""
@@ -15,7 +75,9 @@ class Graphic(widgets.QWidget):
     def __init__(self, observer, shape, commands):
         self.main = widgets.QApplication(sys.argv)
         super().__init__(None)
-        self.shape = shape
+        self.shape = self.viewport = tuple(
+            min(size, most) for size, most in zip(shape, VIEWPORT)
+        )
 
         icon_map = {
             " ": "empty",
@@ -35,49 +97,56 @@ class Graphic(widgets.QWidget):
             self.icons[symbol] = gui.QPixmap(
                 os.getcwd() + "/view/images/{}.png".format(name)
             )
-        self.grid = np.empty(self.shape, widgets.QLabel)
+        # last frame drawn, as bytes
+        self.frame = None
 
         self._init_ui(observer, commands)
 
-    def _cells(self):
-        """offer easy iteration over grid coordinates"""
-        for i in range(self.shape[0]):
-            for j in range(self.shape[1]):
-                yield i, j
-
     def _init_ui(self, observer, commands):
         """Setup GUI layout and widgets"""
         self.setWindowTitle("Kwirk")
         self.setGeometry(100, 100, 0, 0)
-        self.layout = widgets.QGridLayout()
+        self.layout = widgets.QHBoxLayout()
         self.layout.setSpacing(0)
 
-        for i, j in self._cells():
-            self.grid[i, j] = widgets.QLabel()
-            self.layout.addWidget(self.grid[i, j], i, j)
+        board_type = (
+            LabelBoard if self.shape[0] * self.shape[1] <= LABEL_LIMIT else CanvasBoard
+        )
+        self.board = board_type(self.shape, self.icons, observer)
+        self.layout.addWidget(self.board)
 
+        controls = widgets.QGridLayout()
         self.controls = []
         for symbol, direction in commands.items():
             button = widgets.QPushButton(self)
             button.setText(symbol)
-            position = [(1 + direction[0]), self.shape[1] + (1 + direction[1])]
-            self.layout.addWidget(button, *position, 1, 1)
+            controls.addWidget(button, 1 + direction[0], 1 + direction[1], 1, 1)
             button.clicked.connect(observer(symbol))
 
         self.character_button = widgets.QPushButton(self)
         self.character_button.setIcon(gui.QIcon(self.icons["1"]))
         self.character_button.clicked.connect(observer("2"))
-        self.layout.addWidget(self.character_button, 1, self.shape[1] + 1, 1, 1)
+        controls.addWidget(self.character_button, 1, 1, 1, 1)
+        self.layout.addLayout(controls)
 
         self.setLayout(self.layout)
         self.show()
 
     def update(self, grid, active_character):
-        """Update grid display and character switch iconi."""
-        data = np.array([list(line) for line in grid.split("\n")])
-        assert data.shape == self.shape
-        for i, j in self._cells():
-            self.grid[i, j].setPixmap(self.icons[data[i, j]])
+        """Repaint cells whose symbol changed since last frame,
+        and character switch icon."""
+        frame = np.frombuffer((grid + "\n").encode(), np.uint8).reshape(
+            self.shape[0], -1
+        )[:, :-1]
+        assert frame.shape == self.shape
+        changed = (
+            np.argwhere(frame != self.frame)
+            if self.frame is not None
+            else np.argwhere(frame > 0)
+        )
+        for i, j in changed:
+            self.board.draw(i, j, chr(frame[i, j]))
+        self.frame = frame
         self.character_button.setIcon(gui.QIcon(self.icons[active_character]))
 
     def launch(self):
@@ -0,0 +1,246 @@
+"""Serve many game sessions over a local socket with a line protocol.
+
+Each connection plays its own game, on the level the server was started with.
+Client lines :
+    <commands>      game commands, answered by "<status> <step> <active> <state hash>"
+                    where status is win, dead, quit or running
+    show            board text, followed by an empty line
+    level <name>    restart on another level : a layout file or a pack:level identifier
+                    of a .kwp pack, in the levels directory $KWIRK_LEVELS
+    reset           restart on the current level
+    solve           shortest commands winning from the current state :
+                    "solution <commands>", "unsolvable", or "unknown" when not found
+                    within the node budget, searched in a worker process.
+                    "busy" when sent before the answer to the previous solve
+                    of the session
+    metrics         server metrics as one JSON line
+    bye             close the connection
+A line that fails is answered "error <message>", the session goes on.
+Lines already received are applied together, answers are flushed once per batch.
+A client that does not read its answers stops being read from.
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+
+from control import Game
+from model import Grid
+from model.cache import Cache
+from solver import SearchLimit, solve
+from .apps import App
+
+
+def _search(grid, active, budget, cache):
+    """Answer to solve, computed in a worker process."""
+    try:
+        solution = solve(grid, cache=cache, max_nodes=budget, active=active)
+    except SearchLimit:
+        return "unknown"
+    return "unsolvable" if solution is None else f"solution {solution}"
+
+
+@App.register("s")
+class Server:
+    """Asyncio app hosting one game per client on the compact backend.
+    Levels are parsed once, sessions copy the parsed grid.
+    Listens on a Unix socket if path is set, on host and port otherwise.
+    """
+
+    host = "127.0.0.1"
+    port = int(os.environ.get("KWIRK_PORT", 7878))
+    path = os.environ.get("KWIRK_SOCKET")
+    # lines waiting per session before its socket is no longer read
+    backlog = 64
+    # search nodes allowed to answer solve, results are kept in cache_file if set
+    budget = 20000
+    cache_file = os.environ.get("KWIRK_CACHE")
+    # worker processes searching for solve, all cores by default
+    solvers = None
+    # directory of the levels clients may switch to, none without it
+    root = os.environ.get("KWIRK_LEVELS")
+    # parsed levels kept, least recently used first dropped
+    kept_levels = 32
+
+    def __init__(self, observer, *a):
+        self.observer = observer
+        self.cache = Cache(self.cache_file) if self.cache_file else None
+        self.levels = OrderedDict()
+        self.default = None
+        self.sessions = 0
+        self.sessions_total = 0
+        self.moves = 0
+        self._started = time.perf_counter()
+        self._window = (self._started, 0)
+        self._server = None
+        self._pool = None
+
+    def update(self, grid, _):
+        """The first board shown is the level served by default."""
+        if self.default is None:
+            self.default = grid
+
+    def level(self, source):
+        """Parsed grid of level source, shared by its sessions."""
+        if source in self.levels:
+            self.levels.move_to_end(source)
+            return self.levels[source]
+        grid = self.levels[source] = Grid(source, backend="compact")
+        if len(self.levels) > self.kept_levels:
+            self.levels.popitem(last=False)
+        return grid
+
+    def find(self, name):
+        """Source of the level a client names : a layout file, or a pack:level
+        identifier of a .kwp pack, right in root. Raise ValueError for any other name.
+        """
+        file, colon, level = name.partition(":")
+        path = None if self.root is None else os.path.join(self.root, file)
+        if (
+            path is None
+            or file in ("", ".", "..")
+            or os.path.basename(file) != file
+            or file.endswith(".kwp") != bool(colon)
+            or not os.path.isfile(path)
+        ):
+            raise ValueError(f"unknown level {name}")
+        return path + colon + level
+
+    def metrics(self):
+        now = time.perf_counter()
+        since, moves = self._window
+        self._window = now, self.moves
+        return {
+            "sessions": self.sessions,
+            "sessions_total": self.sessions_total,
+            "moves": self.moves,
+            "moves_per_second": (self.moves - moves) / max(now - since, 1e-9),
+            "uptime": now - self._started,
+        }
+
+    async def start(self):
+        """Listen for clients, return the asyncio server."""
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._session, self.path)
+        else:
+            self._server = await asyncio.start_server(
+                self._session, self.host, self.port
+            )
+        return self._server
+
+    async def serve(self):
+        async with await self.start() as server:
+            await server.serve_forever()
+
+    def launch(self):
+        """Enter server mainloop."""
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+
+    def game_over(self):
+        """Stop accepting clients and searching."""
+        if self._server is not None:
+            self._server.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _answer(self, session, line, received=0):
+        """Apply one client line received at perf_counter time received to session,
+        return answer text or None to close."""
+        if line == "bye":
+            return None
+        if line == "show":
+            return str(session.game.grid) + "\n"
+        if line == "metrics":
+            return json.dumps(self.metrics())
+        if line.startswith("level "):
+            source = self.find(line[6:])
+            self.level(source)
+            session.source = source
+            line = "reset"
+        if line == "reset":
+            session.start(self.level(session.source))
+            return "ok"
+        if session.ended is not None:
+            return f"over {session.ended}"
+        if line == "solve":
+            return await self._solve(session, received)
+
+        outcome = session.game.run(line)
+        session.ended = outcome.status
+        self.moves += outcome.step + (outcome.status is not None)
+        status = outcome.status or "running"
+        return f"{status} {outcome.step} {outcome.active} {outcome.state_hash:016x}"
+
+    async def _solve(self, session, received):
+        """Search in the pool while the event loop serves other sessions.
+        A session has one search at most, later solves sent meanwhile are refused."""
+        if received < session.solved:
+            return "busy"
+        if self._pool is None:
+            # workers forked from here would hold client sockets open
+            context = multiprocessing.get_context("forkserver")
+            self._pool = concurrent.futures.ProcessPoolExecutor(self.solvers, context)
+        game = session.game
+        job = game.grid, game.active_character, self.budget, self.cache
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._pool, _search, *job)
+        finally:
+            session.solved = time.perf_counter()
+
+    async def _session(self, reader, writer):
+        """Read lines into a bounded queue, answer them in batches."""
+        queue = asyncio.Queue(self.backlog)
+
+        async def receive():
+            async for line in reader:
+                await queue.put((time.perf_counter(), line.decode().strip()))
+            await queue.put((time.perf_counter(), "bye"))
+
+        receiving = asyncio.create_task(receive())
+        session = Session(self.default, self.level(self.default))
+        self.sessions += 1
+        self.sessions_total += 1
+        try:
+            answer = ""
+            while answer is not None:
+                lines = [await queue.get()]
+                while not queue.empty():
+                    lines.append(queue.get_nowait())
+                answers = []
+                for received, line in lines:
+                    try:
+                        answer = await self._answer(session, line, received)
+                    except Exception as error:
+                        answer = f"error {error}"
+                    if answer is None:
+                        break
+                    answers.append(answer + "\n")
+                writer.write("".join(answers).encode())
+                await writer.drain()
+        finally:
+            receiving.cancel()
+            self.sessions -= 1
+            writer.close()
+
+
+class Session:
+    """Game of one client, ended holds the status the game ended with
+    and solved the time its last solve was answered."""
+
+    def __init__(self, source, grid):
+        self.source = source
+        self.solved = 0
+        self.start(grid)
+
+    def start(self, grid):
+        self.game = Game(grid.copy(), None)
+        self.ended = None